@@ -0,0 +1,160 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# === CONFIG ===
+SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+INDEX_VERSION_FILE = "./vectorstore_web_gemini/.index_version"
+VERSION_CHECK_SECONDS = float(os.getenv("ANSWER_CACHE_VERSION_CHECK", "2"))   # how often lookups re-read it
+
+
+def index_version(path=INDEX_VERSION_FILE):
+    """Changes whenever a build/sync script modifies the vectorstore."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def bump_index_version(path=INDEX_VERSION_FILE):
+    """Called by the build scripts after they change a collection."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(str(time.time_ns()))
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed on the query embedding.
+
+    A lookup hits when a stored query is within `threshold` cosine
+    similarity of the new one. Entries expire after `ttl` seconds, the
+    least recently used entry is evicted past `max_entries`, and the whole
+    cache is dropped when the vectorstore's index version changes (checked
+    at most every VERSION_CHECK_SECONDS). An optional `scope` (e.g. the
+    year filter a query resolved to) must match too, so "2023 datesheet"
+    never reuses the answer for "2024 datesheet".
+
+    Vectors live in one preallocated (max_entries, dim) matrix, one row per
+    slot, so a lookup is a single matrix-vector product plus masks.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, ttl=TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.matrix = None              # allocated on the first store, once the dimension is known
+        self.live = np.zeros(max_entries, dtype=bool)
+        self.created = np.zeros(max_entries)
+        self.scope_ids = np.full(max_entries, -1, dtype=np.int32)
+        self.scope_codes = {}           # scope -> small int stored in scope_ids
+        self.payload = [None] * max_entries     # slot -> (answer, sources)
+        self.slot_keys = [None] * max_entries   # slot -> key in self.entries
+        self.entries = OrderedDict()    # key -> slot, least recently used first
+        self.free = list(range(max_entries - 1, -1, -1))
+        self.next_key = 0
+        self.version = index_version()
+        self.version_checked = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _unit(embedding):
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else None
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self.version_checked < VERSION_CHECK_SECONDS:
+            return
+        self.version_checked = now
+        version = index_version()
+        if version != self.version:
+            self._clear()
+            self.version = version
+
+    def _clear(self):
+        self.live[:] = False
+        self.payload = [None] * self.max_entries
+        self.slot_keys = [None] * self.max_entries
+        self.entries.clear()
+        self.free = list(range(self.max_entries - 1, -1, -1))
+
+    def _drop(self, key):
+        slot = self.entries.pop(key)
+        self.live[slot] = False
+        self.payload[slot] = None
+        self.slot_keys[slot] = None
+        self.free.append(slot)
+
+    def lookup(self, embedding, scope=None):
+        """Return {"answer", "sources", "similarity"} for a close enough cached query, else None."""
+        vec = self._unit(embedding)
+        with self.lock:
+            self._check_version()
+            now = time.time()
+            for slot in np.flatnonzero(self.live & (now - self.created > self.ttl)):
+                self._drop(self.slot_keys[slot])
+
+            code = self.scope_codes.get(scope)
+            if vec is None or code is None or self.matrix is None or vec.shape[0] != self.matrix.shape[1]:
+                self.misses += 1
+                return None
+            candidates = self.live & (self.scope_ids == code)
+            if not candidates.any():
+                self.misses += 1
+                return None
+
+            sims = np.where(candidates, self.matrix @ vec, -np.inf)
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(self.slot_keys[best])
+            answer, sources = self.payload[best]
+            self.hits += 1
+            return {"answer": answer, "sources": list(sources), "similarity": float(sims[best])}
+
+    def store(self, embedding, answer, sources, scope=None):
+        vec = self._unit(embedding)
+        if vec is None:
+            return  # failed (zero) embeddings must never match anything
+        with self.lock:
+            self._check_version()
+            if self.matrix is None or self.matrix.shape[1] != vec.shape[0]:
+                # First store, or the embedding model changed: start over at the new dimension
+                self.matrix = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+                self._clear()
+            if not self.free:
+                self._drop(next(iter(self.entries)))
+            slot = self.free.pop()
+            self.matrix[slot] = vec
+            self.live[slot] = True
+            self.created[slot] = time.time()
+            self.scope_ids[slot] = self.scope_codes.setdefault(scope, len(self.scope_codes))
+            self.payload[slot] = (answer, list(sources))
+            self.slot_keys[slot] = self.next_key
+            self.entries[self.next_key] = slot
+            self.next_key += 1
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self.entries),
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+        }
@@ -1,8 +1,37 @@
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from rag_agent import rag_query
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+import rag_agent
+from rag_agent import answer_query_async, answer_queries_async, rag_query_stream
+from load_control import Overloaded, generate_limiter
+import metrics
 
-app = FastAPI()
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "100"))
+
+# EAGER_INIT=1 (default): open Chroma and warm the indexes as soon as the
+# worker starts, in the background so /healthz answers meanwhile; /readyz
+# turns 200 once it is done. EAGER_INIT=0 leaves it to the first request.
+EAGER_INIT = os.getenv("EAGER_INIT", "1") != "0"
+
+async def warm_start():
+    try:
+        await rag_agent.init_async()
+    except Exception as e:
+        print(f"❌ Startup failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    task = asyncio.create_task(warm_start()) if EAGER_INIT else None
+    yield
+    if task:
+        task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 # --- Enable CORS for Firebase (important) ---
 app.add_middleware(
@@ -13,6 +42,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def overloaded_response(retry_after, message):
+    return JSONResponse({"error": message}, status_code=503, headers={"Retry-After": str(retry_after)})
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Full upstream queue or a Gemini 429: tell the client when to retry instead of a 500."""
+    return overloaded_response(exc.retry_after, str(exc))
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Per-stage spans (metrics.span) go out as a Server-Timing header and into /metrics."""
+    spans = metrics.start_request()
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route else "unmatched"   # keeps label cardinality bounded
+    metrics.request_seconds.observe(time.perf_counter() - started, path=path, status=response.status_code)
+    # /query/stream sends its headers before any stage runs; its spans only reach /metrics
+    spans["total"] = time.perf_counter() - started
+    response.headers["Server-Timing"] = metrics.server_timing(spans)
+    return response
+
 @app.post("/query")
 async def query_endpoint(request: Request):
     data = await request.json()
@@ -21,13 +72,91 @@ async def query_endpoint(request: Request):
     if not user_query:
         return {"error": "Missing query"}
 
-    answer, sources = rag_query(user_query)
+    result = await answer_query_async(user_query)
     return {
         "query": user_query,
-        "answer": answer,
-        "sources": sources
+        "answer": result["answer"],
+        "sources": result["sources"],
+        "answered_from": result["answered_from"],
+    }
+
+@app.post("/query/batch")
+async def query_batch_endpoint(request: Request):
+    """{"queries": [...]} -> {"results": [...]} in input order; failed items carry an "error"."""
+    data = await request.json()
+    queries = data.get("queries")
+
+    if not isinstance(queries, list) or not queries:
+        return {"error": "Missing queries"}
+    if len(queries) > BATCH_MAX_QUERIES:
+        return {"error": f"At most {BATCH_MAX_QUERIES} queries per batch"}
+
+    return {"results": await answer_queries_async(queries)}
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/query/stream")
+async def query_stream_endpoint(request: Request):
+    """Server-Sent Events: `sources` first, then `token` chunks, then `done`."""
+    data = await request.json()
+    user_query = data.get("query", "")
+
+    if not user_query:
+        return {"error": "Missing query"}
+    # Once the stream starts the status is already 200, so shed before it does
+    if generate_limiter.saturated():
+        return overloaded_response(generate_limiter.retry_after, "generate is overloaded; retry shortly")
+
+    async def events():
+        try:
+            answered_from = "rag"
+            async for event, payload in rag_query_stream(user_query):
+                if event == "answered_from":
+                    answered_from = payload
+                elif event == "sources":
+                    yield sse_event("sources", {"query": user_query, "sources": payload, "answered_from": answered_from})
+                else:
+                    yield sse_event("token", {"text": payload})
+            yield sse_event("done", {})
+        except Overloaded as e:
+            yield sse_event("error", {"error": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for tuning ANSWER_CACHE_THRESHOLD."""
+    return {
+        "answer_cache": rag_agent.answer_cache.stats() if rag_agent.answer_cache else None,
+        "embedding_cache": rag_agent.embedding_cache.stats() if rag_agent.embedding_cache else None,
     }
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving, warm or not."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once the clients are built and the indexes warmed, 503 before (or if that failed)."""
+    if rag_agent.ready:
+        return {"status": "ready", "startup_seconds": {k: round(v, 3) for k, v in rag_agent.startup_timings.items()}}
+    if rag_agent.init_error:
+        return JSONResponse({"status": "failed", "error": rag_agent.init_error}, status_code=503)
+    return JSONResponse({"status": "starting"}, status_code=503)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape target: stage latencies, prompt sizes, context counts, upstream errors."""
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "IGDTUW RAG API is running!"}
@@ -0,0 +1,131 @@
+"""Deterministic in-process stand-ins for the two genai calls the pipeline makes.
+
+    with FakeGenAI(embed_latency_ms=40, generate_latency_ms=600, fail_rate=0.01):
+        ...  # genai.embed_content / genai.GenerativeModel are patched here
+
+Vectors come from utils/fake_embedding_server.fake_vector, so they match
+what the fake HTTP server returns for the same text. Latency is
+`latency_ms` with +/-`jitter` spread and failures are injected at
+`fail_rate`. Both are drawn from an RNG seeded by (seed, request content,
+how many times that content was sent), so a run is reproducible no matter
+how worker threads interleave, and a retried request gets a fresh draw.
+"""
+import time
+import random
+import hashlib
+import threading
+import google.generativeai as genai
+from utils.fake_embedding_server import fake_vector, DIM
+
+
+class FakeRateLimitError(Exception):
+    """Looks like the 429 the real client raises (see is_rate_limit_error)."""
+
+    def __init__(self):
+        super().__init__("429 Resource has been exhausted (fake)")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenAI:
+    def __init__(self, embed_latency_ms=50, generate_latency_ms=800, first_token_ms=250,
+                 fail_rate=0.0, jitter=0.2, answer_tokens=120, seed=0, dim=DIM):
+        self.embed_latency_ms = embed_latency_ms
+        self.generate_latency_ms = generate_latency_ms
+        self.first_token_ms = first_token_ms
+        self.fail_rate = fail_rate
+        self.jitter = jitter
+        self.answer_tokens = answer_tokens
+        self.dim = dim
+        self.seed = seed
+        self.sent = {}
+        self.lock = threading.Lock()
+        self.calls = {"embed": 0, "generate": 0, "failures": 0}
+        self.saved = None
+
+    def _draw(self, latency_ms, key):
+        """(seconds to sleep, whether to fail) for one call carrying `key`."""
+        key = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        with self.lock:
+            attempt = self.sent.get(key, 0)
+            self.sent[key] = attempt + 1
+        rng = random.Random(f"{self.seed}\x00{key}\x00{attempt}")
+        spread = rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return latency_ms * spread / 1000, rng.random() < self.fail_rate
+
+    def _maybe_fail(self, fail):
+        if fail:
+            with self.lock:
+                self.calls["failures"] += 1
+            raise FakeRateLimitError()
+
+    # --- genai.embed_content ---
+    def embed_content(self, model=None, content=None, task_type=None, **kwargs):
+        with self.lock:
+            self.calls["embed"] += 1
+        key = content if isinstance(content, str) else "\x00".join(content)
+        delay, fail = self._draw(self.embed_latency_ms, key)
+        time.sleep(delay)
+        self._maybe_fail(fail)
+        if isinstance(content, str):
+            return {"embedding": fake_vector(content, self.dim)}
+        return {"embedding": [fake_vector(text, self.dim) for text in content]}
+
+    # --- genai.GenerativeModel ---
+    def answer_for(self, prompt):
+        question = prompt.rsplit("User question:", 1)[-1].split("Answer:", 1)[0].strip()
+        words = [f"token{i}" for i in range(self.answer_tokens)]
+        return f"(fake answer to: {question}) " + " ".join(words)
+
+    def generate(self, prompt, stream=False):
+        with self.lock:
+            self.calls["generate"] += 1
+        delay, fail = self._draw(self.generate_latency_ms, prompt)
+        first = delay * self.first_token_ms / self.generate_latency_ms if self.generate_latency_ms else 0
+        answer = self.answer_for(prompt)
+        if not stream:
+            time.sleep(delay)
+            self._maybe_fail(fail)
+            return FakeResponse(answer)
+        return self._stream(answer, first, max(delay - first, 0), fail)
+
+    def _stream(self, answer, first, rest, fail):
+        time.sleep(first)
+        self._maybe_fail(fail)
+        chunks = [answer[i:i + 40] for i in range(0, len(answer), 40)]
+        for chunk in chunks:
+            yield FakeResponse(chunk)
+            time.sleep(rest / len(chunks))
+
+    def model_class(self):
+        fake = self
+
+        class FakeGenerativeModel:
+            def __init__(self, model_name=None, **kwargs):
+                self.model_name = model_name
+
+            def generate_content(self, prompt, stream=False, **kwargs):
+                return fake.generate(prompt, stream=stream)
+
+        return FakeGenerativeModel
+
+    # --- patching ---
+    def install(self):
+        self.saved = (genai.embed_content, genai.GenerativeModel)
+        genai.embed_content = self.embed_content
+        genai.GenerativeModel = self.model_class()
+        return self
+
+    def uninstall(self):
+        if self.saved:
+            genai.embed_content, genai.GenerativeModel = self.saved
+            self.saved = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
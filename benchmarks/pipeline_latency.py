@@ -0,0 +1,246 @@
+"""Offline ingestion + query benchmark: no API keys, no network.
+
+    python -m benchmarks.pipeline_latency --docs 2000 --queries 200
+    python -m benchmarks.pipeline_latency --embed-latency-ms 80 --fail-rate 0.02 --compare benchmarks/results/pipeline-abc1234.json
+
+Runs against a throwaway working directory: a synthetic corpus
+(benchmarks/synthetic_corpus.py) is synced into a fresh Chroma store with
+the real build code, then every query goes through the rag_agent stages
+one by one. genai is replaced by benchmarks/fake_genai.py, so the numbers
+measure our own code plus the injected latency. Everything is seeded, so
+two runs on the same machine and commit give comparable results.
+
+Results are printed and saved as JSON (default: benchmarks/results/pipeline-<commit>.json).
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import datetime
+import subprocess
+import contextlib
+from collections import defaultdict
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)    # the run chdirs into a temp dir, imports must still resolve
+
+from benchmarks.fake_genai import FakeGenAI
+from benchmarks.synthetic_corpus import write_dataset
+from utils.jsonl_io import read_jsonl
+
+STAGES = ["embed", "parse", "retrieve", "prompt", "generate", "total"]
+
+
+def summarize(samples_ms):
+    if not samples_ms:
+        return {"count": 0}
+    arr = np.asarray(samples_ms)
+    return {
+        "count": len(arr),
+        "mean": round(float(arr.mean()), 3),
+        **{f"p{p}": round(float(np.percentile(arr, p)), 3) for p in (50, 95, 99)},
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def quiet(verbose):
+    """Silence the pipeline's per-query prints unless --verbose."""
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+def run_build(paths, workdir):
+    """Sync both synthetic collections with the real build code; returns per-collection throughput."""
+    import build_vectorstore
+    import qna_vectorstore
+    from embedding_engine import EmbeddingEngine
+    from embedding_providers import get_provider, record_signature
+    from vectorstore_sync import sync_collection
+    from bm25_index import build_from_chroma
+
+    with open(paths["qna"], "r", encoding="utf-8") as f:
+        faqs = json.load(f)
+    sources = {
+        "igdtuw_web": build_vectorstore.load_documents(read_jsonl(paths["merged"])),
+        "igdtuw_qna": qna_vectorstore.load_documents(faqs),
+    }
+
+    provider = get_provider()
+    client = build_vectorstore.chroma_client
+    build = {}
+    for name, docs in sources.items():
+        collection = client.get_or_create_collection(name)
+        engine = EmbeddingEngine(task_type="retrieval_document", provider=provider, use_cache=False)
+        started = time.perf_counter()
+        upserted, _ = sync_collection(collection, docs, engine)
+        seconds = time.perf_counter() - started
+        record_signature(collection, provider)
+        build[name] = {
+            "docs": upserted,
+            "seconds": round(seconds, 3),
+            "docs_per_sec": round(upserted / seconds, 2) if seconds else 0.0,
+            "embed_docs_per_sec": round(engine.docs_per_sec, 2),
+            "failed": engine.docs_failed,
+        }
+
+    started = time.perf_counter()
+    build_from_chroma(client)
+    build["bm25_seconds"] = round(time.perf_counter() - started, 3)
+    return build
+
+
+def run_queries(queries, n_results):
+    """Each query through the same stages as rag_agent.answer_query, timed separately."""
+    import rag_agent
+    rag_agent.init()    # the stage functions below skip the entry points' lazy init
+
+    samples = defaultdict(list)
+    counts = {"count": len(queries), "fast_path": 0, "errors": 0}
+
+    def timed(stage, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            samples[stage].append((time.perf_counter() - started) * 1000)
+
+    for user_query in queries:
+        started = time.perf_counter()
+        try:
+            query_emb = timed("embed", rag_agent.get_query_embeddings, [user_query])[0]
+            where = timed("parse", rag_agent.query_where, user_query)
+            fast, all_docs, all_sources = timed("retrieve", rag_agent.retrieve, user_query, query_emb, n_results, where)
+            if fast:
+                counts["fast_path"] += 1
+            else:
+                prompt = timed("prompt", rag_agent.build_prompt, user_query, all_docs, all_sources)
+                timed("generate", rag_agent.generate, prompt)
+        except Exception:
+            counts["errors"] += 1
+        samples["total"].append((time.perf_counter() - started) * 1000)
+
+    return {stage: summarize(samples[stage]) for stage in STAGES}, counts
+
+
+def print_results(results):
+    print(f"\n📊 commit {results['commit']}{' (dirty)' if results['dirty'] else ''}, "
+          f"{results['queries']['count']} queries "
+          f"({results['queries']['fast_path']} FAQ fast path, {results['queries']['errors']} errors)")
+    for name in ("igdtuw_web", "igdtuw_qna"):
+        b = results["build"][name]
+        print(f"🏗️  build {name:<11} {b['docs']:>6} docs in {b['seconds']:7.2f}s  "
+              f"{b['docs_per_sec']:8.1f} docs/sec  ({b['failed']} failed)")
+    print(f"{'stage':<10}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in results["stages"].items():
+        if s["count"]:
+            print(f"{stage:<10}{s['count']:>7}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['p99']:>10.2f}")
+
+
+def print_comparison(old, new):
+    print(f"\n🔀 vs. {old.get('commit')} (negative = faster)")
+    for name in ("igdtuw_web", "igdtuw_qna"):
+        before, after = old["build"][name]["docs_per_sec"], new["build"][name]["docs_per_sec"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"build {name:<11} docs/sec {before:8.1f} → {after:8.1f} ({change:+.1f}%)")
+    for stage, s in new["stages"].items():
+        prev = old["stages"].get(stage, {})
+        if not s.get("count") or not prev.get("count"):
+            continue
+        print(f"{stage:<10} p50 {prev['p50']:8.2f} → {s['p50']:8.2f} ms ({s['p50'] - prev['p50']:+.2f})   "
+              f"p95 {prev['p95']:8.2f} → {s['p95']:8.2f} ms ({s['p95'] - prev['p95']:+.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--faqs", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-results", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embed-latency-ms", type=float, default=50)
+    parser.add_argument("--generate-latency-ms", type=float, default=800)
+    parser.add_argument("--first-token-ms", type=float, default=250)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of fake API calls that raise a 429")
+    parser.add_argument("--retriever", default="chroma", choices=["chroma", "memory"])
+    parser.add_argument("--retrieval-mode", default="hybrid", choices=["hybrid", "dense", "lexical"])
+    parser.add_argument("--workdir", help="keep the synthetic store here instead of a temp dir")
+    parser.add_argument("--out", help="results JSON (default: benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="igdtuw-bench-"))
+    paths = write_dataset(os.path.join(workdir, "data"), args.docs, args.faqs, args.queries, args.seed)
+    queries = [row["query"] for row in read_jsonl(paths["queries"])]
+
+    # Must be set before rag_agent / the build scripts are imported
+    os.environ.update({
+        "GOOGLE_API_KEY": "fake-key",
+        "EMBEDDING_PROVIDER": "gemini",
+        "EMBED_CACHE": "0",
+        "ANSWER_CACHE": "0",
+        "RAG_RERANK": "0",
+        "RAG_RETRIEVER": args.retriever,
+        "RAG_RETRIEVAL_MODE": args.retrieval_mode,
+    })
+    os.environ.pop("GEMINI_API_ENDPOINT", None)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    random.seed(args.seed)     # EmbeddingEngine's backoff jitter
+
+    fake = FakeGenAI(
+        embed_latency_ms=args.embed_latency_ms,
+        generate_latency_ms=args.generate_latency_ms,
+        first_token_ms=args.first_token_ms,
+        fail_rate=args.fail_rate,
+        seed=args.seed,
+    )
+    try:
+        with fake, quiet(args.verbose):
+            build = run_build(paths, workdir)
+            stages, counts = run_queries(queries, args.n_results)
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    commit, dirty = git_commit()
+    results = {
+        "benchmark": "pipeline_latency",
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "workdir", "verbose")},
+        "build": build,
+        "queries": counts,
+        "stages": stages,
+        "fake_calls": fake.calls,
+    }
+    print_results(results)
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"pipeline-{commit}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Saved {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
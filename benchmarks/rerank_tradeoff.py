@@ -0,0 +1,102 @@
+"""Latency vs. quality of the cross-encoder rerank stage.
+
+    python -m benchmarks.rerank_tradeoff --queries 100
+    python -m benchmarks.rerank_tradeoff --eval my_eval.jsonl
+
+Each eval line is {"query": ..., "relevant_ids": [...]}. Without --eval the
+set is built from igdtuw_qna: every FAQ question is a query whose FAQ entry
+is the relevant document. Candidates come from the BM25 index over both
+collections (web pages act as distractors), so no API key is needed.
+"""
+import json
+import time
+import random
+import argparse
+import numpy as np
+from bm25_index import BM25Index, INDEX_PATH
+from reranker import CrossEncoderReranker, interleave
+
+
+def load_eval(path, index, limit):
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            items = [json.loads(line) for line in f if line.strip()]
+    else:
+        items = [
+            {"query": row["metadata"].get("question", ""), "relevant_ids": [row["id"]]}
+            for row in index.rows
+            if row["collection"] == "igdtuw_qna" and row["metadata"].get("question")
+        ]
+    random.Random(0).shuffle(items)
+    return items[:limit]
+
+
+def candidates(index, query, depth):
+    """Web then FAQ BM25 hits, laid out as rag_agent hands them to the reranker.
+
+    Returns (ids, docs, groups); `groups` are the per-collection sizes.
+    """
+    web = index.search(query, depth, collection="igdtuw_web")
+    faq = index.search(query, depth, collection="igdtuw_qna")
+    ids = web["ids"][0] + faq["ids"][0]
+    docs = web["documents"][0] + faq["documents"][0]
+    return ids, docs, (len(web["ids"][0]), len(faq["ids"][0]))
+
+
+def baseline(ids, groups):
+    """No-rerank ranking: web and FAQ hits alternated rank by rank (an equal-weight
+    RRF of the two lists), so FAQ hits are not pushed past top-k by the web list."""
+    return [ids[i] for i in interleave(*groups)]
+
+
+def quality(ranked_ids, relevant, k):
+    """(hit@k, reciprocal rank within k)."""
+    for rank, doc_id in enumerate(ranked_ids[:k]):
+        if doc_id in relevant:
+            return 1.0, 1.0 / (rank + 1)
+    return 0.0, 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eval", help="JSONL of {query, relevant_ids}")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--candidates", type=int, default=20, help="per collection")
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--caps", default="10,25,50,100,200,0", help="latency caps in ms (0 = uncapped)")
+    args = parser.parse_args()
+
+    index = BM25Index.load(INDEX_PATH)
+    items = load_eval(args.eval, index, args.queries)
+    reranker = CrossEncoderReranker()
+    reranker.rerank("warm up", ["warm up"], 1)
+
+    print(f"📊 {len(items)} queries, {args.candidates} candidates per collection, top-{args.top_k}")
+    print(f"{'stage':<22}{'hit@k':>8}{'MRR@k':>8}{'p50 ms':>9}{'p95 ms':>9}{'scored':>8}")
+
+    hits, rrs = [], []
+    for it in items:
+        ids, _, groups = candidates(index, it["query"], args.candidates)
+        hit, rr = quality(baseline(ids, groups), set(it["relevant_ids"]), args.top_k)
+        hits.append(hit)
+        rrs.append(rr)
+    print(f"{'no rerank':<22}{np.mean(hits):>8.3f}{np.mean(rrs):>8.3f}{0:>9.1f}{0:>9.1f}{0:>8}")
+
+    for cap in [float(c) for c in args.caps.split(",")]:
+        hits, rrs, latency, scored = [], [], [], []
+        for it in items:
+            ids, docs, groups = candidates(index, it["query"], args.candidates)
+            started = time.perf_counter()
+            order, n_scored = reranker.rerank(it["query"], docs, args.top_k, max_ms=cap or float("inf"), groups=groups)
+            latency.append((time.perf_counter() - started) * 1000)
+            hit, rr = quality([ids[i] for i in order], set(it["relevant_ids"]), args.top_k)
+            hits.append(hit)
+            rrs.append(rr)
+            scored.append(n_scored)
+        label = f"rerank cap {cap:.0f}ms" if cap else "rerank uncapped"
+        print(f"{label:<22}{np.mean(hits):>8.3f}{np.mean(rrs):>8.3f}"
+              f"{np.percentile(latency, 50):>9.1f}{np.percentile(latency, 95):>9.1f}{np.mean(scored):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
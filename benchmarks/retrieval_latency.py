@@ -0,0 +1,86 @@
+"""Per-query retrieval latency: two Chroma queries vs. the in-memory index.
+
+    python -m benchmarks.retrieval_latency --queries 200
+    python -m benchmarks.retrieval_latency --dtype float16
+
+Query vectors are sampled from the stored embeddings (plus noise), so no
+API key is needed. The snapshot is exported to a temporary directory, so
+the one the app serves (memory_index.SNAPSHOT_DIR) is left alone.
+"""
+import time
+import tempfile
+import argparse
+import numpy as np
+import chromadb
+from memory_index import MemoryIndex, export_snapshot, SNAPSHOT_DTYPE
+
+
+def percentiles(samples_ms):
+    arr = np.asarray(samples_ms)
+    return {p: float(np.percentile(arr, p)) for p in (50, 95, 99)}
+
+
+def report(name, samples_ms):
+    p = percentiles(samples_ms)
+    print(f"{name:<32} p50={p[50]:7.2f}ms  p95={p[95]:7.2f}ms  p99={p[99]:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-results", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32, help="batch size for the batched in-memory run")
+    parser.add_argument("--dtype", default=SNAPSHOT_DTYPE, choices=["int8", "float16", "float32"])
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path="./vectorstore_web_gemini")
+    with tempfile.TemporaryDirectory(prefix="retrieval_latency-") as snapshot_dir:
+        run(args, client, snapshot_dir)
+
+
+def run(args, client, snapshot_dir):
+    collection_web = client.get_or_create_collection("igdtuw_web")
+    collection_faq = client.get_or_create_collection("igdtuw_qna")
+
+    export_snapshot(client, snapshot_dir, dtype=args.dtype)
+    index = MemoryIndex(snapshot_dir)
+    if not len(index):
+        print("❌ Vectorstore is empty; build it first.")
+        return
+
+    rng = np.random.default_rng(0)
+    picks = index.vectors(rng.integers(0, len(index), args.queries))
+    queries = picks + rng.normal(0, 0.02, picks.shape).astype(np.float32)
+
+    chroma_ms, memory_ms, overlap = [], [], []
+    for q in queries:
+        q = q.tolist()
+        started = time.perf_counter()
+        res_web = collection_web.query(query_embeddings=[q], n_results=args.n_results)
+        collection_faq.query(query_embeddings=[q], n_results=args.n_results)
+        chroma_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        res = index.query([q], args.n_results)
+        memory_ms.append((time.perf_counter() - started) * 1000)
+        expected = set(res_web["ids"][0])
+        if expected:
+            overlap.append(len(expected & set(res["igdtuw_web"]["ids"][0])) / len(expected))
+
+    batched_ms = []
+    for start in range(0, len(queries), args.batch):
+        batch = queries[start:start + args.batch]
+        started = time.perf_counter()
+        index.query(batch, args.n_results)
+        batched_ms.append((time.perf_counter() - started) * 1000 / len(batch))
+
+    print(f"\n📊 {args.queries} queries, {len(index)} indexed rows ({index.dtype}), top-{args.n_results} per collection")
+    report("chroma (web + faq queries)", chroma_ms)
+    report("memory index (single)", memory_ms)
+    report(f"memory index (batch of {args.batch}, per q)", batched_ms)
+    if overlap:
+        print(f"top-{args.n_results} web overlap with Chroma: {np.mean(overlap):.3f}")
+
+
+if __name__ == "__main__":
+    main()
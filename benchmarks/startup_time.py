@@ -0,0 +1,70 @@
+"""Cold-start cost of a web worker, measured in fresh interpreters.
+
+    python -m benchmarks.startup_time --runs 5
+    python -m benchmarks.startup_time --importtime 15
+
+Each run imports app (which must stay cheap: no store or network access at
+import), then calls rag_agent.init() and reports its `init` (clients,
+collections, BM25 / memory index) and `warm_up` (HNSW page-in) phases.
+Gemini is never called; the store measured is the repo's
+./vectorstore_web_gemini.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUN = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter() - started
+import rag_agent
+rag_agent.init()
+print(json.dumps({"import_app": imported, **rag_agent.startup_timings, "total": time.perf_counter() - started}))
+"""
+
+
+def run_once():
+    out = subprocess.run([sys.executable, "-c", RUN], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit):
+    """Top `limit` modules by cumulative import time, from `python -X importtime`."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="also list the N slowest imports")
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+
+    print(f"{'phase':<12}{'p50 s':>10}{'max s':>10}")
+    for phase in samples[0]:
+        values = np.asarray([s.get(phase, 0.0) for s in samples])
+        print(f"{phase:<12}{np.median(values):>10.3f}{values.max():>10.3f}")
+
+    if args.importtime:
+        print("\n🐢 Slowest imports of app (cumulative):")
+        for micros, name in slowest_imports(args.importtime):
+            print(f"{micros / 1000:10.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Seeded synthetic data shaped like the real pipeline files.
+
+    python -m benchmarks.synthetic_corpus --docs 2000 --faqs 300 --out-dir /tmp/igdtuw-synthetic
+
+Writes merged_content.jsonl (web pages + PDFs, as merge_web_and_pdf.py
+produces), qna_data.json (as sheets_to_qna.py produces) and queries.jsonl.
+The same seed always gives byte-identical files.
+"""
+import os
+import json
+import random
+import argparse
+from utils.jsonl_io import write_jsonl
+from utils.relevance import relevance_from_url, relevance_from_text
+
+BASE_URL = "https://www.igdtuw.ac.in"
+SECTIONS = ["examinations", "admissions", "placements", "newsletters", "academics", "hostel", "events", "notices"]
+TOPICS = {
+    "examinations": ["datesheet", "exam schedule", "supplementary exam", "result", "re-evaluation", "admit card"],
+    "admissions": ["admission", "counselling", "fee structure", "eligibility", "seat matrix", "document verification"],
+    "placements": ["placement", "recruiters", "average package", "internship", "training cell", "placement drive"],
+    "newsletters": ["newsletter", "achievements", "alumni", "faculty awards", "student clubs", "convocation"],
+    "academics": ["syllabus", "curriculum", "course", "credits", "academic calendar", "elective"],
+    "hostel": ["hostel", "mess", "room allotment", "warden", "hostel fee", "curfew"],
+    "events": ["fest", "hackathon", "workshop", "seminar", "cultural night", "sports meet"],
+    "notices": ["circular", "holiday", "notice", "scholarship", "anti-ragging", "grievance"],
+}
+PROGRAMMES = ["B.Tech", "M.Tech", "MBA", "B.Arch", "MCA", "PhD", "BBA"]
+BRANCHES = ["CSE", "IT", "ECE", "AI-ML", "MAE", "Architecture"]
+FILLER = (
+    "students are advised to check the official website regularly for updates "
+    "the university reserves the right to modify the schedule if required "
+    "all candidates must carry a valid identity card "
+    "for any queries contact the office of the dean during working hours "
+    "the decision of the competent authority shall be final "
+).split()
+
+
+def sentence(rng, topic, year):
+    words = [rng.choice(FILLER) for _ in range(rng.randint(8, 16))]
+    words.insert(rng.randrange(len(words)), topic)
+    if rng.random() < 0.5:
+        words.insert(rng.randrange(len(words)), f"{rng.choice(PROGRAMMES)} {rng.choice(BRANCHES)}")
+    if rng.random() < 0.4:
+        words.insert(rng.randrange(len(words)), str(year))
+    text = " ".join(words)
+    return text[0].upper() + text[1:] + "."
+
+
+def document(rng, i):
+    section = rng.choice(SECTIONS)
+    topic = rng.choice(TOPICS[section])
+    year = rng.randint(2019, 2025)
+    is_pdf = rng.random() < 0.4
+    length = rng.randint(60, 2000) if is_pdf else rng.randint(20, 500)   # words, PDFs run long
+    text = []
+    while sum(len(s.split()) for s in text) < length:
+        text.append(sentence(rng, topic, year))
+    text = " ".join(text)
+    title = f"{topic.title()} {year} - {rng.choice(PROGRAMMES)}"
+
+    if is_pdf:
+        return {
+            "url": f"igdtuw-data\\pdfs\\{section}_{topic.replace(' ', '_')}_{year}_{i}.pdf",
+            "type": "pdf",
+            "title": title,
+            "relevance_hint": relevance_from_text(text),
+            "text": text[:15000],
+        }
+    url = f"{BASE_URL}/{section}/{topic.replace(' ', '-')}-{year}-{i}"
+    return {
+        "url": url,
+        "type": "webpage",
+        "title": title,
+        "relevance_hint": relevance_from_url(url),
+        "text": text[:10000],
+    }
+
+
+def generate_corpus(n_docs, seed=0):
+    rng = random.Random(seed)
+    for i in range(n_docs):
+        yield document(rng, i)
+
+
+def generate_faqs(n_faqs, seed=0):
+    rng = random.Random(f"faq-{seed}")
+    faqs = []
+    for i in range(n_faqs):
+        section = rng.choice(SECTIONS)
+        topic = rng.choice(TOPICS[section])
+        programme = rng.choice(PROGRAMMES)
+        faqs.append({
+            "sheet": section.title(),
+            "question": f"What is the {topic} process for {programme} students? (#{i})",
+            "answer": sentence(rng, topic, rng.randint(2019, 2025)),
+        })
+    return faqs
+
+
+def generate_queries(n_queries, faqs, seed=0):
+    """Mix of FAQ paraphrases (fast-path candidates) and open questions, some with years."""
+    rng = random.Random(f"queries-{seed}")
+    queries = []
+    for _ in range(n_queries):
+        if faqs and rng.random() < 0.25:
+            queries.append(rng.choice(faqs)["question"])
+            continue
+        section = rng.choice(SECTIONS)
+        topic = rng.choice(TOPICS[section])
+        template = rng.choice([
+            "When is the {topic}?",
+            "Tell me about the {topic} for {programme}",
+            "What is the {topic} for {year}?",
+            "Latest {topic} notice",
+            "{programme} {branch} {topic} details",
+        ])
+        queries.append(template.format(
+            topic=topic, programme=rng.choice(PROGRAMMES), branch=rng.choice(BRANCHES), year=rng.randint(2019, 2025)
+        ))
+    return queries
+
+
+def write_dataset(out_dir, n_docs, n_faqs, n_queries, seed=0):
+    """Write the three files; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        "merged": os.path.join(out_dir, "merged_content.jsonl"),
+        "qna": os.path.join(out_dir, "qna_data.json"),
+        "queries": os.path.join(out_dir, "queries.jsonl"),
+    }
+    write_jsonl(paths["merged"], generate_corpus(n_docs, seed))
+    faqs = generate_faqs(n_faqs, seed)
+    with open(paths["qna"], "w", encoding="utf-8") as f:
+        json.dump(faqs, f, indent=4, ensure_ascii=False)
+    write_jsonl(paths["queries"], ({"query": q} for q in generate_queries(n_queries, faqs, seed)))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--faqs", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default="./benchmarks/synthetic")
+    args = parser.parse_args()
+
+    paths = write_dataset(args.out_dir, args.docs, args.faqs, args.queries, args.seed)
+    for name, path in paths.items():
+        print(f"📝 {name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import re
+import math
+import time
+import pickle
+import argparse
+from collections import Counter, defaultdict
+from query_filters import matches
+
+# === CONFIG ===
+INDEX_PATH = "./vectorstore_web_gemini/bm25_index.pkl"
+COLLECTIONS = ("igdtuw_web", "igdtuw_qna")
+K1 = 1.5
+B = 0.75
+RRF_K = 60
+SAVED_FIELDS = ("postings", "rows", "lengths", "idf", "avgdl")
+
+token_pattern = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercased alphanumeric tokens; keeps course codes ("cse201") and years intact."""
+    return token_pattern.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted BM25 index over the same documents as igdtuw_web and igdtuw_qna.
+
+    Built from the Chroma collections (i.e. merged_content.json and
+    qna_data.json after sync), so document IDs line up with dense results.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(list)   # term -> [(row, term frequency)]
+        self.rows = []                      # {"id", "collection", "document", "metadata"}
+        self.lengths = []
+        self.idf = {}
+        self.avgdl = 0.0
+
+    def add(self, collection, doc_id, document, metadata):
+        row = len(self.rows)
+        tokens = tokenize(document)
+        self.rows.append({"id": doc_id, "collection": collection, "document": document, "metadata": metadata or {}})
+        self.lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self.postings[term].append((row, tf))
+
+    def finalize(self):
+        n = len(self.rows)
+        self.avgdl = sum(self.lengths) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(posts) + 0.5) / (len(posts) + 0.5))
+            for term, posts in self.postings.items()
+        }
+        self.postings = dict(self.postings)
+
+    def search(self, query, n_results=5, collection=None, where=None):
+        """Top BM25 hits as a single-query, Chroma-style result (no distances)."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for row, tf in self.postings[term]:
+                if collection and self.rows[row]["collection"] != collection:
+                    continue
+                norm = tf + K1 * (1 - B + B * self.lengths[row] / (self.avgdl or 1))
+                scores[row] += idf * tf * (K1 + 1) / norm
+
+        if where:
+            scores = {row: score for row, score in scores.items() if matches(self.rows[row]["metadata"], where)}
+        top = sorted(scores, key=scores.get, reverse=True)[:n_results]
+        return {
+            "ids": [[self.rows[r]["id"] for r in top]],
+            "documents": [[self.rows[r]["document"] for r in top]],
+            "metadatas": [[self.rows[r]["metadata"] for r in top]],
+            "scores": [[scores[r] for r in top]],
+        }
+
+    def save(self, path=INDEX_PATH):
+        """Pickle the index as plain data, so loading never depends on which module built it."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = {field: getattr(self, field) for field in SAVED_FIELDS}
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path=INDEX_PATH):
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if isinstance(state, BM25Index):    # saved before the index was stored as plain data
+            return state
+        index = BM25Index()
+        for field in SAVED_FIELDS:
+            setattr(index, field, state[field])
+        return index
+
+
+def build_from_chroma(chroma_client, path=INDEX_PATH, collections=COLLECTIONS, page_size=2000):
+    index = BM25Index()
+    for name in collections:
+        collection = chroma_client.get_or_create_collection(name)
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            for doc_id, doc, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                index.add(name, doc_id, doc or "", meta)
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+    index.finalize()
+    index.save(path)
+    print(f"✅ BM25 index over {len(index.rows)} documents ({len(index.idf)} terms) saved to {path}")
+    return index
+
+
+def reciprocal_rank_fusion(dense, lexical, n_results=5, k=RRF_K):
+    """Fuse two single-query Chroma-style results by reciprocal rank; dense distances are kept."""
+    fused = defaultdict(float)
+    entries = {}
+    for result in (dense, lexical):
+        for rank, (doc_id, doc, meta) in enumerate(
+            zip(result["ids"][0], result["documents"][0], result["metadatas"][0])
+        ):
+            fused[doc_id] += 1.0 / (k + rank + 1)
+            entries.setdefault(doc_id, (doc, meta))
+
+    distances = dict(zip(dense["ids"][0], (dense.get("distances") or [[]])[0]))
+    top = sorted(fused, key=fused.get, reverse=True)[:n_results]
+    return {
+        "ids": [top],
+        "documents": [[entries[d][0] for d in top]],
+        "metadatas": [[entries[d][1] for d in top]],
+        # Lexical-only hits have no dense distance; 2.0 (orthogonal) keeps them out of the FAQ fast path
+        "distances": [[distances.get(d, 2.0) for d in top]],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the BM25 index from igdtuw_web + igdtuw_qna.")
+    parser.add_argument("--out", default=INDEX_PATH)
+    args = parser.parse_args()
+
+    import chromadb
+    started = time.perf_counter()
+    build_from_chroma(chromadb.PersistentClient(path="./vectorstore_web_gemini"), args.out)
+    print(f"⏱️ Build took {time.perf_counter() - started:.1f}s")
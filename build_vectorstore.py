@@ -1,83 +1,101 @@
-import os
-import json
-from tqdm import tqdm
+import argparse
 from dotenv import load_dotenv
 import chromadb
-import google.generativeai as genai
-import re
+from embedding_engine import EmbeddingEngine, configure_gemini
+from embedding_providers import get_provider, check_signature, record_signature
+from vectorstore_sync import stable_id, content_hash, sync_collection, refresh_derived_indexes
+from utils.jsonl_io import read_jsonl, is_writing
+from utils.relevance import document_category, years_in
 
 # --- Setup ---
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+configure_gemini()
 
-chroma_client = chromadb.PersistentClient(path="./vectorstore_web_gemini")
-collection = chroma_client.get_or_create_collection(
-    name="igdtuw_web",
-    metadata={"source": "web_and_pdfs"}
-)
-
-# --- Load merged content ---
-with open(r"igdtuw-data\json_data\merged_content.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
+DATA_PATH = r"igdtuw-data\json_data\merged_content.jsonl"
+COLLECTION_NAME = "igdtuw_web"
 
-print(f"📄 Loaded {len(data)} entries.")
+chroma_client = chromadb.PersistentClient(path="./vectorstore_web_gemini")
 
-# --- Embedding function ---
-def get_gemini_embeddings(texts):
-    embeddings = []
-    for text in texts:
-        try:
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text[:6000],
-                task_type="retrieval_document"
-            )
-            embeddings.append(result["embedding"])
-        except Exception as e:
-            print(f"⚠️ Embedding failed: {e}")
-            embeddings.append([0] * 768)
-    return embeddings
-
-
-# --- Build vectorstore safely ---
-batch_size = 10
-total_added = 0
-year_pattern = re.compile(r"(20\d{2})")
-
-for batch_start in tqdm(range(0, len(data), batch_size), desc="Building Vector Store"):
-    batch = data[batch_start:batch_start + batch_size]
-
-    valid_items = []
-    for item in batch:
+# Bump when the derived metadata changes, so existing docs get re-upserted
+# (their vectors come straight from the embedding cache)
+METADATA_VERSION = "2"
+
+
+# --- Turn merged content into {id, text, metadata} docs ---
+def document_metadata(item):
+    url = item.get("url", "")
+    title = item.get("title") or ""
+    years = years_in(url + " " + title + " " + item["text"])
+    return {
+        "url": url,
+        "title": title,
+        "type": item.get("type", ""),
+        # Range of years the document talks about; 0 when it names none
+        "year": years[-1] if years else 0,
+        "year_min": years[0] if years else 0,
+        "category": document_category(url, title, item.get("relevance_hint", "")),
+    }
+
+
+def load_documents(data):
+    """Generator: one {id, text, metadata} doc per usable record."""
+    for item in data:
         text = item.get("text", "").strip()
         url = item.get("url", "")
-        title = item.get("title")
-
-        years = re.findall(year_pattern, url + title + text)
-        latest_year = max(map(int, years)) if years else None
 
         # Keep both web pages and local igdtuw-data PDFs
-        if text and (url.startswith("http") or "igdtuw-data" in url):
-            valid_items.append(item)
-
-    if not valid_items:
-        continue
-
-    texts = [item["text"] for item in valid_items]
-    metadatas = [
-        {
-            "url": item.get("url", ""),
-            "title": item.get("title", ""),
-            "type": item.get("type", ""),
-            "year": latest_year if latest_year else ""
+        if not (text and (url.startswith("http") or "igdtuw-data" in url)):
+            continue
+
+        metadata = document_metadata(item)
+        fingerprint = f"{METADATA_VERSION}\x00{metadata['year_min']}-{metadata['year']}\x00{metadata['category']}"
+        metadata["content_hash"] = content_hash(item["text"] + fingerprint)
+        yield {
+            # ID depends only on the URL/path, so it survives reruns and recrawls
+            "id": stable_id("web", url),
+            "text": item["text"],
+            "metadata": metadata,
         }
-        for item in valid_items
-    ]
-    ids = [f"id_{batch_start + j}_{hash(item['url']) % 10000}" for j, item in enumerate(valid_items)]
 
-    embeddings = get_gemini_embeddings(texts)
-    collection.add(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
 
-    total_added += len(valid_items)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync merged_content.jsonl into the igdtuw_web collection.")
+    parser.add_argument("--rebuild", action="store_true", help="drop the collection and embed everything again")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--follow", action="store_true",
+                        help="start embedding while the merge stage is still writing --data")
+    args = parser.parse_args()
 
-print(f"✅ Added {total_added} total documents (web + PDFs) to vectorstore.")
+    if args.rebuild:
+        try:
+            chroma_client.delete_collection(COLLECTION_NAME)
+            print(f"🗑️ Dropped collection {COLLECTION_NAME}.")
+        except Exception:
+            pass
+
+    collection = chroma_client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        metadata={"source": "web_and_pdfs"}
+    )
+
+    # --- Stream merged content ---
+    # A file whose writer is gone but left its marker is a crash leftover:
+    # embed what is there, but don't delete docs that merely weren't reached.
+    partial = not args.follow and is_writing(args.data)
+    if partial:
+        print(f"⚠️ {args.data} looks incomplete; syncing what is there and skipping deletions.")
+    print(f"📄 Streaming entries from {args.data}...")
+
+    docs = load_documents(read_jsonl(args.data, follow=args.follow))
+    provider = get_provider()
+    check_signature(collection, provider)  # never mix vectors from different models
+    engine = EmbeddingEngine(task_type="retrieval_document", provider=provider)
+    upserted, deleted = sync_collection(collection, docs, engine, delete_missing=not partial)
+    record_signature(collection, provider)
+
+    engine.report()  # includes the embedding cache hit rate
+
+    refresh_derived_indexes(chroma_client, upserted or deleted)
+
+    print(f"✅ Upserted {upserted} and deleted {deleted} documents (web + PDFs); "
+          f"collection now holds {collection.count()}.")
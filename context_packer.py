@@ -0,0 +1,129 @@
+import os
+import re
+from bm25_index import tokenize
+from embedding_engine import estimate_tokens
+
+# === CONFIG ===
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+BLOCK_TOKEN_LIMIT = int(os.getenv("CONTEXT_BLOCK_TOKEN_LIMIT", "700"))
+DUPLICATE_JACCARD = float(os.getenv("CONTEXT_DUPLICATE_JACCARD", "0.6"))
+PASSAGE_CHARS = 400
+SHINGLE_SIZE = 5
+
+sentence_split = re.compile(r"(?<=[.!?])\s+|\s+(?=Q:)|\s+---\s+")
+
+
+def split_passages(text, size=PASSAGE_CHARS):
+    """Group sentences into passages of roughly `size` characters."""
+    passages, current = [], ""
+    for sentence in sentence_split.split(text):
+        if not sentence:
+            continue
+        if current and len(current) + len(sentence) > size:
+            passages.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+        while len(current) > size * 2:      # pages without punctuation
+            passages.append(current[:size])
+            current = current[size:]
+    if current:
+        passages.append(current)
+    return passages
+
+
+def shingles(text, n=SHINGLE_SIZE):
+    words = tokenize(text)
+    if len(words) < n:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def passage_score(passage, query_terms):
+    terms = set(tokenize(passage))
+    return sum(1 for t in query_terms if t in terms) / (len(query_terms) or 1)
+
+
+def trim_block(text, query_terms, limit=BLOCK_TOKEN_LIMIT):
+    """Keep the most query-relevant passages of a block (in original order) within `limit` tokens."""
+    if estimate_tokens(text) <= limit:
+        return text, passage_score(text, query_terms)
+
+    passages = split_passages(text)
+    scores = [passage_score(p, query_terms) for p in passages]
+    ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+    if scores[ranked[0]] > 0:
+        # Only passages that mention the query; otherwise fall back to the opening passages
+        ranked = [i for i in ranked if scores[i] > 0]
+    keep, used = set(), 0
+    for i in ranked:
+        cost = estimate_tokens(passages[i])
+        if used + cost > limit:
+            continue
+        keep.add(i)
+        used += cost
+    if not keep:
+        keep = {ranked[0]}
+        passages[ranked[0]] = passages[ranked[0]][: limit * 4]
+    kept = [passages[i] for i in sorted(keep)]
+    best = max(passage_score(p, query_terms) for p in kept)
+    return " … ".join(kept), best
+
+
+def source_label(source):
+    """URLs and PDF paths label themselves; FAQ sources are the answer text, so just say FAQ."""
+    if not source:
+        return "Web content"
+    if source.startswith("http") or "igdtuw-data" in source or source == "Web content":
+        return source
+    return "IGDTUW FAQ"
+
+
+def pack_context(user_query, docs, sources, budget=CONTEXT_TOKEN_BUDGET):
+    """Build the prompt context from retrieved docs.
+
+    Blocks are trimmed to their relevant passages, near-duplicates are
+    dropped, and the rest are packed by relevance into `budget` tokens,
+    each labelled with its source.
+    Returns (context, stats).
+    """
+    query_terms = set(tokenize(user_query))
+    naive = "\n\n---\n\n".join(docs) + "\n\n---\n\n" + "\n\n---\n\n".join(s or "" for s in sources)
+
+    blocks = []
+    for rank, (doc, source) in enumerate(zip(docs, sources)):
+        if not doc:
+            continue
+        text, score = trim_block(doc, query_terms)
+        blocks.append({"rank": rank, "text": text, "source": source_label(source),
+                       "score": score, "shingles": shingles(text)})
+    # Lexical relevance, nudged by retrieval rank so strong dense hits aren't starved
+    blocks.sort(key=lambda b: (-(b["score"] + 0.5 / (1 + b["rank"])), b["rank"]))
+
+    packed, used, duplicates = [], 0, 0
+    for block in blocks:
+        if any(jaccard(block["shingles"], kept["shingles"]) >= DUPLICATE_JACCARD for kept in packed):
+            duplicates += 1
+            continue
+        entry = f"[Source: {block['source']}]\n{block['text']}"
+        cost = estimate_tokens(entry)
+        if used + cost > budget:
+            continue
+        packed.append(dict(block, entry=entry))
+        used += cost
+
+    context = "\n\n---\n\n".join(b["entry"] for b in packed)
+    stats = {
+        "blocks_in": len(docs),
+        "blocks_out": len(packed),
+        "duplicates_dropped": duplicates,
+        "tokens_before": estimate_tokens(naive),
+        "tokens_after": used,
+    }
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return context, stats
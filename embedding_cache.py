@@ -0,0 +1,156 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+# === CONFIG ===
+CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embedding_cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+EVICT_SLACK = 0.05      # eviction goes this far below the limit, so a full cache is not re-counted every put
+
+
+def cache_key(model, task_type, text):
+    """Content address for an embedding: hash of model, task type and (truncated) text."""
+    h = hashlib.sha256()
+    for part in (model, task_type, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache (SQLite) with size-bounded LRU eviction.
+
+    Vectors are stored as float32 blobs. Shared by the indexing scripts and
+    the query path, so rebuilds and repeated questions skip the API.
+
+    Rows are not counted on every put: `approx_entries` is an upper bound
+    (a replaced key counts as new) that is re-counted only once it passes
+    `max_entries`; eviction then trims to EVICT_SLACK below the limit.
+    Rows added by other processes are seen at that re-count.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.touched = {}       # key -> last_used not yet written (get_many(touch=False))
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self.conn.commit()
+        self.approx_entries = self.count()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys, touch=True):
+        """Look up `keys`; returns {key: vector} for the ones that are cached.
+
+        With touch=False the lookup is read-only: the LRU timestamps of the
+        hits are kept in memory and written with the next put_many(), so a
+        hot read path never waits on SQLite's write lock.
+        """
+        found = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self.lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                if rows and touch:
+                    self.conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key, _ in rows],
+                    )
+                elif rows:
+                    self.touched.update((key, now) for key, _ in rows)
+            if touch:
+                self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store (key, vector) pairs, then evict least-recently-used rows over the limit."""
+        if not items:
+            return
+        now = time.time()
+        with self.lock:
+            if self.touched:
+                touched, self.touched = self.touched, {}
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(used, key) for key, used in touched.items()],
+                )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items],
+            )
+            self.approx_entries += len(items)
+            if self.approx_entries > self.max_entries:
+                count = self.count()
+                if count > self.max_entries:
+                    keep = self.max_entries - int(self.max_entries * EVICT_SLACK)
+                    self.conn.execute(
+                        "DELETE FROM embeddings WHERE key IN "
+                        "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                        (count - keep,),
+                    )
+                    count = keep
+                self.approx_entries = count
+            self.conn.commit()
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put(self, key, vector):
+        self.put_many([(key, vector)])
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        with self.lock:
+            size = self.count()
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate, 4), "entries": size}
+
+    def report(self):
+        s = self.stats()
+        print(f"💾 Embedding cache: {s['hits']} hits / {s['misses']} misses "
+              f"({s['hit_rate']:.1%} hit rate), {s['entries']} entries.")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Process-wide cache instance, or None when EMBED_CACHE=0."""
+    global _default_cache
+    if os.getenv("EMBED_CACHE", "1") == "0":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+    return _default_cache
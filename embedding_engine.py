@@ -0,0 +1,199 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import google.generativeai as genai
+from embedding_cache import cache_key, get_default_cache
+from embedding_providers import get_provider, GEMINI_EMBED_MODEL
+
+# === CONFIG ===
+EMBED_MODEL = GEMINI_EMBED_MODEL
+MAX_CHARS = 6000            # same truncation the old per-text helpers used
+BATCH_SIZE = 100            # batchEmbedContents accepts at most 100 texts
+MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))
+REQUESTS_PER_MINUTE = int(os.getenv("EMBED_RPM", "1500"))
+TOKENS_PER_MINUTE = int(os.getenv("EMBED_TPM", "1000000"))
+MAX_RETRIES = 5
+
+
+def configure_gemini():
+    """Configure genai, optionally pointing it at a local (fake) endpoint.
+
+    Set GEMINI_API_ENDPOINT=http://localhost:8765 to run against
+    utils/fake_embedding_server.py instead of Google.
+    """
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        genai.configure(
+            api_key=os.getenv("GOOGLE_API_KEY", "fake-key"),
+            transport="rest",
+            client_options={"api_endpoint": endpoint},
+        )
+    else:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 chars per token) used for TPM pacing."""
+    return max(1, len(text) // 4)
+
+
+def is_rate_limit_error(error):
+    """True for 429 / quota errors from the Gemini client."""
+    msg = str(error).lower()
+    return (
+        "429" in msg
+        or "resource exhausted" in msg
+        or "resourceexhausted" in type(error).__name__.lower()
+        or "quota" in msg
+    )
+
+
+class RateLimiter:
+    """Sliding one-minute window over request count and token count."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.window = deque()       # (timestamp, tokens)
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Block until one more request of `tokens` fits in the budget."""
+        tokens = min(tokens, self.tpm)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.window and now - self.window[0][0] >= 60:
+                    self.window.popleft()
+                used = sum(t for _, t in self.window)
+                if now >= self.paused_until and len(self.window) < self.rpm and used + tokens <= self.tpm:
+                    self.window.append((now, tokens))
+                    return
+                wait = max(self.paused_until - now, 0.05)
+                if self.window and (len(self.window) >= self.rpm or used + tokens > self.tpm):
+                    wait = max(wait, 60 - (now - self.window[0][0]))
+            time.sleep(min(wait, 5))
+
+    def pause(self, seconds):
+        """Hold back every worker for `seconds` (used after a 429)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class EmbeddingEngine:
+    """Batched, concurrent, rate-limited embedding of many texts.
+
+    Texts are sent in batches of `batch_size`, with at most `max_workers`
+    requests in flight. Items that still fail after `max_retries` are not
+    replaced by zero vectors: they come back as None and are pushed onto
+    `retry_queue` as (key, text) so the caller can retry them later.
+
+    Texts already in the embedding cache are served from disk and never
+    reach the API; pass `use_cache=False` to bypass it.
+
+    `provider` comes from embedding_providers (default: EMBEDDING_PROVIDER).
+    Local providers run one batch at a time without rate limiting.
+    """
+
+    def __init__(self, task_type="retrieval_document", provider=None,
+                 batch_size=BATCH_SIZE, max_workers=MAX_WORKERS,
+                 requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_retries=MAX_RETRIES, embed_batch=None, use_cache=True):
+        self.task_type = task_type
+        self.provider = provider or get_provider()
+        self.model = self.provider.model
+        self.batch_size = batch_size
+        self.max_workers = max_workers if self.provider.remote else 1
+        self.max_retries = max_retries
+        self.embed_batch = embed_batch or self.provider.embed_batch
+        if not self.provider.remote:
+            requests_per_minute = tokens_per_minute = float("inf")
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.cache = get_default_cache() if use_cache else None
+        self.retry_queue = deque()
+        self.docs_embedded = 0
+        self.docs_failed = 0
+        self.seconds = 0.0
+
+    def _call(self, texts):
+        """One batch request with exponential backoff; None if it never succeeds."""
+        tokens = sum(estimate_tokens(t) for t in texts)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                return self.embed_batch(texts, self.task_type, model=self.model)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"⚠️ Embedding batch of {len(texts)} failed: {e}")
+                    return None
+                delay = min(2 ** attempt, 60) + random.uniform(0, 1)
+                if is_rate_limit_error(e):
+                    self.limiter.pause(delay)
+                time.sleep(delay)
+
+    def embed(self, texts, keys=None):
+        """Embed `texts`; returns a list aligned with the input (None on failure)."""
+        if keys is None:
+            keys = list(range(len(texts)))
+        truncated = [t[:MAX_CHARS] for t in texts]
+
+        started = time.perf_counter()
+        embeddings = [None] * len(texts)
+        hashes = [cache_key(self.model, self.task_type, t) for t in truncated]
+        cached = self.cache.get_many(hashes) if self.cache else {}
+        for i, h in enumerate(hashes):
+            embeddings[i] = cached.get(h)
+
+        # Only cache misses go over the network
+        todo = [i for i, e in enumerate(embeddings) if e is None]
+        batches = [todo[start:start + self.batch_size] for start in range(0, len(todo), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [
+                (batch, pool.submit(self._call, [truncated[i] for i in batch]))
+                for batch in batches
+            ]
+            for batch, future in futures:
+                result = future.result()
+                if result is None:
+                    self.retry_queue.extend((keys[i], texts[i]) for i in batch)
+                    continue
+                for i, vector in zip(batch, result):
+                    embeddings[i] = list(vector)
+                if self.cache:
+                    self.cache.put_many([(hashes[i], embeddings[i]) for i in batch])
+        self.seconds += time.perf_counter() - started
+
+        done = sum(1 for e in embeddings if e is not None)
+        self.docs_embedded += done
+        self.docs_failed += len(texts) - done
+        return embeddings
+
+    def drain_retry_queue(self):
+        """Retry everything in `retry_queue` once; yields (key, embedding) for successes."""
+        pending = list(self.retry_queue)
+        self.retry_queue.clear()
+        if not pending:
+            return
+        self.docs_failed -= len(pending)
+        keys = [key for key, _ in pending]
+        texts = [text for _, text in pending]
+        for key, embedding in zip(keys, self.embed(texts, keys=keys)):
+            if embedding is not None:
+                yield key, embedding
+
+    @property
+    def docs_per_sec(self):
+        return self.docs_embedded / self.seconds if self.seconds else 0.0
+
+    def report(self):
+        print(
+            f"⚡ Embedded {self.docs_embedded} docs in {self.seconds:.1f}s "
+            f"({self.docs_per_sec:.1f} docs/sec), {self.docs_failed} failed."
+        )
+        if self.cache:
+            self.cache.report()
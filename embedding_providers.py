@@ -0,0 +1,123 @@
+import os
+import threading
+import google.generativeai as genai
+
+# === CONFIG ===
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini")
+GEMINI_EMBED_MODEL = "models/text-embedding-004"
+LOCAL_EMBED_MODEL = os.getenv("LOCAL_EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+LOCAL_EMBED_DEVICE = os.getenv("LOCAL_EMBED_DEVICE", "cpu")
+LOCAL_EMBED_BATCH_SIZE = int(os.getenv("LOCAL_EMBED_BATCH_SIZE", "32"))
+# bge models expect this instruction in front of search queries (not passages)
+LOCAL_QUERY_PREFIX = os.getenv(
+    "LOCAL_QUERY_PREFIX", "Represent this sentence for searching relevant passages: "
+)
+
+
+class GeminiProvider:
+    """Remote embeddings from Google's text-embedding-004."""
+
+    name = "gemini"
+    remote = True
+
+    def __init__(self, model=GEMINI_EMBED_MODEL):
+        self.model = model
+        self.dimension = 768
+
+    def embed_batch(self, texts, task_type, model=None, timeout=None):
+        """Embed a list of texts with one batchEmbedContents call."""
+        kwargs = {"request_options": {"timeout": timeout}} if timeout else {}
+        result = genai.embed_content(model=model or self.model, content=texts, task_type=task_type, **kwargs)
+        return result["embedding"]
+
+
+class SentenceTransformerProvider:
+    """Local CPU embeddings with sentence-transformers, batched inference."""
+
+    name = "sentence-transformers"
+    remote = False
+
+    def __init__(self, model=LOCAL_EMBED_MODEL, device=LOCAL_EMBED_DEVICE, batch_size=LOCAL_EMBED_BATCH_SIZE):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = model
+        self.batch_size = batch_size
+        self.encoder = SentenceTransformer(model, device=device)
+        self.dimension = self.encoder.get_sentence_embedding_dimension()
+
+    def embed_batch(self, texts, task_type, model=None, timeout=None):
+        if task_type == "retrieval_query":
+            texts = [LOCAL_QUERY_PREFIX + t for t in texts]
+        vectors = self.encoder.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+
+PROVIDERS = {
+    GeminiProvider.name: GeminiProvider,
+    SentenceTransformerProvider.name: SentenceTransformerProvider,
+    "local": SentenceTransformerProvider,
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name=None):
+    """Shared provider instance for `name` (default: EMBEDDING_PROVIDER)."""
+    name = name or EMBEDDING_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER {name!r}; choose from {sorted(PROVIDERS)}")
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = PROVIDERS[name]()
+        return _providers[name]
+
+
+# --- Index signature: which provider built a collection ---
+# Collections built before signatures existed were all made with Gemini
+LEGACY_SIGNATURE = {
+    "embedding_provider": GeminiProvider.name,
+    "embedding_model": GEMINI_EMBED_MODEL,
+    "embedding_dim": 768,
+}
+
+
+def index_signature(provider):
+    return {
+        "embedding_provider": provider.name,
+        "embedding_model": provider.model,
+        "embedding_dim": provider.dimension,
+    }
+
+
+def stored_signature(collection):
+    """Signature recorded on `collection`; legacy signature for older non-empty ones, None if empty."""
+    meta = collection.metadata or {}
+    if "embedding_provider" in meta:
+        return {key: meta.get(key) for key in LEGACY_SIGNATURE}
+    return dict(LEGACY_SIGNATURE) if collection.count() else None
+
+
+def check_signature(collection, provider):
+    """Refuse to mix embeddings from different providers/models/dimensions."""
+    stored = stored_signature(collection)
+    expected = index_signature(provider)
+    if stored is not None and stored != expected:
+        raise RuntimeError(
+            f"Collection {collection.name!r} was built with {stored} but the current "
+            f"embedding provider is {expected}. Rebuild it (--rebuild) or set "
+            f"EMBEDDING_PROVIDER/LOCAL_EMBED_MODEL to match."
+        )
+
+
+def record_signature(collection, provider):
+    """Store the provider signature in the collection metadata."""
+    meta = {k: v for k, v in (collection.metadata or {}).items() if not k.startswith("hnsw:")}
+    meta.update(index_signature(provider))
+    collection.modify(metadata=meta)
@@ -0,0 +1,113 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+import metrics
+from metrics import span
+
+# === CONFIG ===
+# Per worker process. Calls beyond the limit wait in a queue of at most
+# UPSTREAM_QUEUE_MAX for up to UPSTREAM_QUEUE_TIMEOUT seconds; past that
+# they fail fast with Overloaded (a 503 + Retry-After from app.py).
+EMBED_CONCURRENCY = int(os.getenv("UPSTREAM_EMBED_CONCURRENCY", "16"))
+GENERATE_CONCURRENCY = int(os.getenv("UPSTREAM_GENERATE_CONCURRENCY", "8"))
+QUEUE_MAX = int(os.getenv("UPSTREAM_QUEUE_MAX", "64"))
+QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "10"))
+RETRY_AFTER = int(os.getenv("RETRY_AFTER_SECONDS", "5"))
+
+
+class Overloaded(Exception):
+    """Refused instead of queued: the service (or Gemini) is saturated, try again in `retry_after` seconds."""
+
+    def __init__(self, message, retry_after=RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """At most `limit` concurrent calls, at most `max_waiting` queued behind them.
+
+    A full queue, or a wait longer than `wait_timeout`, raises Overloaded
+    right away, so a spike turns into quick 503s instead of a growing
+    backlog of requests that will time out anyway.
+    """
+
+    def __init__(self, name, limit, max_waiting=QUEUE_MAX, wait_timeout=QUEUE_TIMEOUT, retry_after=RETRY_AFTER):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.retry_after = retry_after
+        self.semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+
+    def saturated(self):
+        """True when a new call would be refused."""
+        return self.semaphore.locked() and self.waiting >= self.max_waiting
+
+    def shed(self, reason):
+        metrics.shed_total.inc(upstream=self.name)
+        return Overloaded(f"{self.name} is overloaded ({reason}); retry shortly", self.retry_after)
+
+    async def _acquire(self):
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            return
+        if self.waiting >= self.max_waiting:
+            raise self.shed(f"{self.waiting} calls queued")
+        self.waiting += 1
+        metrics.upstream_waiting.inc(upstream=self.name)
+        try:
+            with span(f"{self.name}_queue"):
+                await asyncio.wait_for(self.semaphore.acquire(), self.wait_timeout)
+        except TimeoutError:
+            raise self.shed(f"no slot within {self.wait_timeout:g}s") from None
+        finally:
+            self.waiting -= 1
+            metrics.upstream_waiting.dec(upstream=self.name)
+
+    @asynccontextmanager
+    async def slot(self):
+        await self._acquire()
+        metrics.upstream_in_flight.inc(upstream=self.name)
+        try:
+            yield
+        finally:
+            metrics.upstream_in_flight.dec(upstream=self.name)
+            self.semaphore.release()
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one computation.
+
+    The first caller starts it as a task; everyone arriving before it
+    finishes awaits the same task and gets the same result (or exception).
+    A caller that disconnects does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.inflight = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            metrics.coalesced_total.inc()
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if not task.cancelled():
+            task.exception()    # retrieved here so a failure nobody awaited is not logged as lost
+
+
+def coalesce_key(user_query, *extra):
+    """Case- and whitespace-insensitive key, so "Exam dates?" and "exam  dates?" coalesce."""
+    return (" ".join(user_query.lower().split()), *extra)
+
+
+embed_limiter = ConcurrencyLimiter("embed", EMBED_CONCURRENCY)
+generate_limiter = ConcurrencyLimiter("generate", GENERATE_CONCURRENCY)
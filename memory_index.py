@@ -0,0 +1,317 @@
+import os
+import json
+import mmap
+import time
+import shutil
+import tempfile
+import argparse
+from contextlib import contextmanager
+import numpy as np
+from query_filters import matches, where_key
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+# === CONFIG ===
+SNAPSHOT_DIR = "./vectorstore_web_gemini/memory_snapshot"
+COLLECTIONS = ("igdtuw_web", "igdtuw_qna")
+SNAPSHOT_FORMAT = 2
+# int8: 1 byte/dim plus a per-row scale, float16: 2 bytes/dim, float32: exact
+SNAPSHOT_DTYPE = os.getenv("SNAPSHOT_DTYPE", "int8")
+SCORE_CHUNK_ROWS = 8192     # rows dequantized per step, bounds the float32 scratch per query batch
+
+
+def fetch_collection(collection, page_size=2000):
+    """Everything in a Chroma collection: ids, embeddings, documents, metadatas."""
+    out = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset
+        )
+        for key in out:
+            out[key].extend(page[key] if page[key] is not None else [])
+        if len(page["ids"]) < page_size:
+            return out
+        offset += page_size
+
+
+def quantize(matrix, dtype):
+    """(stored vectors, per-row scales or None) for unit-norm float32 rows.
+
+    int8 rows are scaled to use the full -127..127 range; the stored scale
+    is 1 / |quantized row|, so dequantized rows are unit length again and
+    scores stay on the cosine scale.
+    """
+    if dtype == "float32":
+        return matrix.astype(np.float32), None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype != "int8":
+        raise ValueError(f"Unknown snapshot dtype {dtype!r} (int8, float16 or float32)")
+    peak = np.abs(matrix).max(axis=1, keepdims=True)
+    quantized = np.rint(matrix * (127 / np.where(peak == 0, 1, peak))).astype(np.int8)
+    norms = np.linalg.norm(quantized.astype(np.float32), axis=1)
+    return quantized, (1 / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+def write_blobs(path, blobs):
+    """Concatenate byte strings into `path`; returns the (n+1,) int64 offset table."""
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    with open(path, "wb") as f:
+        for i, blob in enumerate(blobs):
+            f.write(blob)
+            offsets[i + 1] = offsets[i] + len(blob)
+    return offsets
+
+
+@contextmanager
+def export_lock(snapshot_dir):
+    """Exclusive lock on `snapshot_dir`, so concurrent workers export one at a time."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(snapshot_dir, ".export.lock"), "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:     # LK_LOCK gives up after ~10s; keep waiting
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def current_version(snapshot_dir=SNAPSHOT_DIR):
+    """Directory of the live snapshot (named by the CURRENT file), or None."""
+    try:
+        with open(os.path.join(snapshot_dir, "CURRENT"), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(snapshot_dir, name) if name else None
+
+
+def snapshot_exists(snapshot_dir=SNAPSHOT_DIR):
+    """True if `snapshot_dir` points at a snapshot this version can open."""
+    version = current_version(snapshot_dir)
+    try:
+        with open(os.path.join(version, "snapshot.json"), "r", encoding="utf-8") as f:
+            return json.load(f).get("format") == SNAPSHOT_FORMAT
+    except (OSError, TypeError, ValueError):
+        return False
+
+
+def prune_versions(snapshot_dir, keep):
+    """Remove every version directory except `keep`, plus format 1 files.
+
+    Workers that still map an old version keep their pages; the files only
+    disappear from the directory.
+    """
+    for name in os.listdir(snapshot_dir):
+        path = os.path.join(snapshot_dir, name)
+        if name.startswith("v-") and name not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif name in ("vectors.npy", "rows.json"):
+            os.remove(path)
+
+
+def ensure_snapshot(chroma_client, snapshot_dir=SNAPSHOT_DIR, **kwargs):
+    """Export only if there is no usable snapshot; safe to call from every worker at once."""
+    with export_lock(snapshot_dir):
+        if not snapshot_exists(snapshot_dir):
+            _export(chroma_client, snapshot_dir, **kwargs)
+
+
+def export_snapshot(chroma_client, snapshot_dir=SNAPSHOT_DIR, collections=COLLECTIONS, dtype=SNAPSHOT_DTYPE):
+    """Dump both collections into a new read-only, memory-mappable snapshot version.
+
+    Each export writes a fresh `v-<time>-<random>/` directory and then swaps
+    the CURRENT pointer with one atomic rename, so a reader opens either
+    the old set or the new one, never a mix. Exports are serialized with a
+    file lock. Files: vectors.npy (normalized, quantized to `dtype`),
+    scales.npy (int8 only), docs.bin / meta.bin with their *_offsets.npy
+    tables (document text and {"id", "metadata"} JSON per row), and
+    snapshot.json. Rows are grouped by collection, so each collection is a
+    contiguous slice. Workers mmap the files, so N workers share one copy
+    in the page cache.
+    """
+    with export_lock(snapshot_dir):
+        _export(chroma_client, snapshot_dir, collections, dtype)
+
+
+def _export(chroma_client, snapshot_dir, collections=COLLECTIONS, dtype=SNAPSHOT_DTYPE):
+    vectors, docs, metas, slices = [], [], [], {}
+    for name in collections:
+        data = fetch_collection(chroma_client.get_or_create_collection(name))
+        start = len(docs)
+        for doc_id, emb, doc, meta in zip(data["ids"], data["embeddings"], data["documents"], data["metadatas"]):
+            vectors.append(np.asarray(emb, dtype=np.float32))
+            docs.append((doc or "").encode("utf-8"))
+            metas.append(json.dumps({"id": doc_id, "metadata": meta or {}}, ensure_ascii=False).encode("utf-8"))
+        slices[name] = [start, len(docs)]
+        print(f"📦 {name}: {len(docs) - start} rows")
+
+    matrix = np.stack(vectors) if vectors else np.zeros((0, 768), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    stored, scales = quantize(matrix / np.where(norms == 0, 1, norms), dtype)
+
+    out = tempfile.mkdtemp(prefix=f"v-{time.strftime('%Y%m%d-%H%M%S')}-", dir=snapshot_dir)
+    os.chmod(out, 0o755)    # mkdtemp makes it private; workers may run as another user
+    version = os.path.basename(out)
+    np.save(os.path.join(out, "vectors.npy"), stored)
+    if scales is not None:
+        np.save(os.path.join(out, "scales.npy"), scales)
+    for kind, blobs in (("docs", docs), ("meta", metas)):
+        np.save(os.path.join(out, f"{kind}_offsets.npy"), write_blobs(os.path.join(out, f"{kind}.bin"), blobs))
+    with open(os.path.join(out, "snapshot.json"), "w", encoding="utf-8") as f:
+        json.dump({"format": SNAPSHOT_FORMAT, "dtype": dtype, "dim": int(stored.shape[1]),
+                   "rows": len(docs), "slices": slices}, f)
+
+    previous = current_version(snapshot_dir)
+    pointer = os.path.join(snapshot_dir, "CURRENT")
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    # The previous version stays one more round for workers opening it right now
+    prune_versions(snapshot_dir, keep={version, os.path.basename(previous or "")})
+
+    size = sum(os.path.getsize(os.path.join(out, n)) for n in os.listdir(out))
+    print(f"✅ Snapshot with {len(docs)} rows ({dtype}, {size / 1e6:.1f} MB) saved to {out}")
+
+
+class Blobs:
+    """Read-only view of a blob file written by write_blobs(), via mmap."""
+
+    def __init__(self, path, offsets_path):
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[int(self.offsets[i]):int(self.offsets[i + 1])]
+
+
+class MemoryIndex:
+    """Exact cosine search over a memory-mapped Chroma snapshot.
+
+    Opening one maps the files without reading them, so a worker starts in
+    milliseconds and every worker on the box shares the same pages. Each
+    requested collection's slice is scored for a batch of queries in
+    chunks (dequantized on the fly), then top-k is taken per query.
+    Results use Chroma's query() layout and its L2 distance scale
+    (2 - 2*cosine for unit vectors), so existing callers and thresholds
+    keep working.
+    """
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        snapshot_dir = current_version(snapshot_dir)
+        if snapshot_dir is None:
+            raise FileNotFoundError("No memory index snapshot; run `python memory_index.py` first.")
+        self.version = os.path.basename(snapshot_dir)
+        with open(os.path.join(snapshot_dir, "snapshot.json"), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        self.dtype = header["dtype"]
+        self.matrix = np.load(os.path.join(snapshot_dir, "vectors.npy"), mmap_mode="r")
+        scales_path = os.path.join(snapshot_dir, "scales.npy")
+        self.scales = np.load(scales_path, mmap_mode="r") if self.dtype == "int8" else None
+        self.docs = Blobs(os.path.join(snapshot_dir, "docs.bin"), os.path.join(snapshot_dir, "docs_offsets.npy"))
+        self.meta = Blobs(os.path.join(snapshot_dir, "meta.bin"), os.path.join(snapshot_dir, "meta_offsets.npy"))
+        self.slices = {name: tuple(bounds) for name, bounds in header["slices"].items()}
+        self.masks = {}
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def row_meta(self, i):
+        """{"id", "metadata"} of row `i`."""
+        return json.loads(self.meta[i])
+
+    def document(self, i):
+        return self.docs[i].decode("utf-8")
+
+    def vectors(self, rows):
+        """Dequantized float32 rows (for benchmarks and tests)."""
+        out = np.asarray(self.matrix[rows], dtype=np.float32)
+        return out * self.scales[rows][..., None] if self.scales is not None else out
+
+    def mask(self, name, where):
+        """Boolean row mask of collection `name` for a Chroma-style `where` (memoized)."""
+        key = (name, where_key(where))
+        if key not in self.masks:
+            start, end = self.slices.get(name, (0, 0))
+            self.masks[key] = np.array(
+                [matches(self.row_meta(i)["metadata"], where) for i in range(start, end)], dtype=bool
+            )
+        return self.masks[key]
+
+    def score(self, q, start, end):
+        """Cosine scores of unit queries `q` against rows start..end, in bounded chunks."""
+        scores = np.empty((len(q), end - start), dtype=np.float32)
+        for lo in range(start, end, SCORE_CHUNK_ROWS):
+            hi = min(lo + SCORE_CHUNK_ROWS, end)
+            block = q @ np.asarray(self.matrix[lo:hi], dtype=np.float32).T
+            if self.scales is not None:
+                block *= self.scales[lo:hi]
+            scores[:, lo - start:hi - start] = block
+        return scores
+
+    def query(self, query_embeddings, n_results=5, collections=COLLECTIONS, where=None):
+        """Top `n_results` per collection for each query; returns {collection: chroma-style result}.
+
+        `where` maps a collection name to a Chroma-style filter for that collection.
+        """
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(q, axis=1, keepdims=True)
+        q = q / np.where(norms == 0, 1, norms)
+
+        results = {}
+        for name in collections:
+            start, end = self.slices.get(name, (0, 0))
+            res = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            block = self.score(q, start, end)
+            allowed = end - start
+            if where and where.get(name):
+                keep = self.mask(name, where[name])
+                block = np.where(keep, block, -np.inf)
+                allowed = int(keep.sum())
+            for row_scores in block:
+                k = min(n_results, allowed)
+                if k <= 0:
+                    top = np.array([], dtype=int)
+                else:
+                    top = np.argpartition(-row_scores, k - 1)[:k]
+                    top = top[np.argsort(-row_scores[top])]
+                rows = [self.row_meta(start + i) for i in top]
+                res["ids"].append([row["id"] for row in rows])
+                res["documents"].append([self.document(start + i) for i in top])
+                res["metadatas"].append([row["metadata"] for row in rows])
+                res["distances"].append([float(2 - 2 * row_scores[i]) for i in top])
+            results[name] = res
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export igdtuw_web + igdtuw_qna into an in-memory index snapshot.")
+    parser.add_argument("--out", default=SNAPSHOT_DIR)
+    parser.add_argument("--dtype", default=SNAPSHOT_DTYPE, choices=["int8", "float16", "float32"])
+    args = parser.parse_args()
+
+    import chromadb
+    started = time.perf_counter()
+    export_snapshot(chromadb.PersistentClient(path="./vectorstore_web_gemini"), args.out, dtype=args.dtype)
+    print(f"⏱️ Export took {time.perf_counter() - started:.1f}s")
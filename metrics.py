@@ -0,0 +1,157 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# === CONFIG ===
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+COUNT_BUCKETS = (0, 1, 2, 4, 6, 8, 11, 16, 24, 32, 64)
+
+registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    """Prometheus counter with optional labels (text exposition only, no client library)."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down (in-flight calls, queue depth)."""
+
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Prometheus histogram; observe() is a bisect plus two adds under a lock."""
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self.series = {}    # label values -> [per-bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            snapshot = {key: list(series) for key, series in self.series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                labels = _labels(self.labelnames + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics():
+    """Everything in the registry, in the Prometheus text format."""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- RAG metrics ---
+stage_seconds = Histogram("rag_stage_seconds", "Time spent in each RAG pipeline stage.", labelnames=("stage",))
+request_seconds = Histogram("rag_http_request_seconds", "End-to-end HTTP request time.", labelnames=("path", "status"))
+prompt_chars = Histogram("rag_prompt_chars", "Prompt size sent to Gemini, in characters.", SIZE_BUCKETS)
+prompt_tokens = Histogram("rag_prompt_tokens", "Prompt size sent to Gemini, in estimated tokens.",
+                          tuple(b // 4 for b in SIZE_BUCKETS))
+context_docs = Histogram("rag_context_docs", "Documents retrieved for the prompt, before and after packing.",
+                         COUNT_BUCKETS, labelnames=("phase",))
+answers_total = Counter("rag_answers_total", "Answers served, by where they came from.", ("answered_from",))
+upstream_errors_total = Counter("rag_upstream_errors_total", "Failed Gemini / Chroma calls on the query path.", ("service",))
+coalesced_total = Counter("rag_coalesced_total", "Queries answered by joining an identical in-flight query.")
+shed_total = Counter("rag_shed_total", "Upstream calls refused with a 503 (queue full or wait timed out).", ("upstream",))
+upstream_in_flight = Gauge("rag_upstream_in_flight", "Upstream calls currently running.", ("upstream",))
+upstream_waiting = Gauge("rag_upstream_waiting", "Upstream calls queued for a slot.", ("upstream",))
+
+
+# --- Per-request spans ---
+_request_spans = contextvars.ContextVar("rag_request_spans", default=None)
+
+
+def start_request():
+    """Start collecting spans for the current request; returns the {stage: seconds} dict."""
+    spans = {}
+    _request_spans.set(spans)
+    return spans
+
+
+@contextmanager
+def span(stage):
+    """Time a block into rag_stage_seconds and, inside a request, its Server-Timing entry."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, stage=stage)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans[stage] = spans.get(stage, 0.0) + elapsed
+
+
+def record(stage, seconds):
+    """Same as span() for a duration measured elsewhere (e.g. a streamed generation)."""
+    stage_seconds.observe(seconds, stage=stage)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans[stage] = spans.get(stage, 0.0) + seconds
+
+
+def server_timing(spans):
+    """`Server-Timing` header value for a request's spans."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in spans.items())
@@ -1,72 +1,111 @@
 import os
 import json
-from tqdm import tqdm
+import argparse
 from dotenv import load_dotenv
 import chromadb
-import google.generativeai as genai
+from embedding_engine import EmbeddingEngine, configure_gemini
+from embedding_providers import get_provider, check_signature, record_signature
+from vectorstore_sync import stable_id, content_hash, sync_collection, upsert_embedded, refresh_derived_indexes
+from answer_cache import bump_index_version
 
 # --- Setup ---
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+configure_gemini()
+
+DATA_PATH = r"igdtuw-data\json_data\qna_data.json"
+COLLECTION_NAME = "igdtuw_qna"
 
 chroma_client = chromadb.PersistentClient(path="./vectorstore_web_gemini")
-collection = chroma_client.get_or_create_collection(
-    name="igdtuw_qna",
-    metadata={"source": "qna_data"}
-)
 
-# --- Load data ---
-with open(r"igdtuw-data\json_data\qna_data.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
 
-print(f"📄 Loaded {len(data)} qna entries.")
+# --- QnA pairs -> {id, text, metadata} docs ---
+def load_documents(data):
+    docs = []
+    for q in data:
+        faq_text = f"Q: {q['question']}; A: {q['answer']}"
+        docs.append({
+            # Keyed on sheet + question instead of list position, so inserting a row doesn't shift IDs
+            "id": stable_id("faq", f"{q.get('sheet', '')}\x00{q['question']}"),
+            "text": faq_text,
+            "metadata": {
+                "source": "faq",
+                "question": q["question"],
+                "answer": q["answer"],
+                "content_hash": content_hash(faq_text),
+            },
+        })
+    return docs
+
+
+def apply_changes(collection, changes, engine):
+    """Patch the collection with a utils/sheets_to_qna.py change list; returns (upserted, deleted, failed).
+
+    Only the added/changed pairs are embedded and nothing else is read, so
+    this costs the same for 5 edits whether the sheet has 50 or 5000 rows.
+    """
+    docs = load_documents(changes.get("added", []) + changes.get("changed", []))
+    upserted = 0
+    if docs:
+        embeddings = engine.embed([doc["text"] for doc in docs], keys=docs)
+        upserted = upsert_embedded(collection, docs, embeddings)
+        for doc, emb in engine.drain_retry_queue():
+            upserted += upsert_embedded(collection, [doc], [emb])
+
+    deleted_ids = [doc["id"] for doc in load_documents(changes.get("deleted", []))]
+    if deleted_ids:
+        collection.delete(ids=deleted_ids)
+
+    if upserted or deleted_ids:
+        bump_index_version()
+    return upserted, len(deleted_ids), len(engine.retry_queue)
+
 
-# --- Embedding helper ---
-def get_gemini_embeddings(texts):
-    embeddings = []
-    for text in texts:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync qna_data.json into the igdtuw_qna collection.")
+    parser.add_argument("--rebuild", action="store_true", help="drop the collection and embed everything again")
+    parser.add_argument("--changes", metavar="QNA_CHANGES_JSON",
+                        help="apply only this change list from utils/sheets_to_qna.py instead of a full sync")
+    args = parser.parse_args()
+    if args.rebuild and args.changes:
+        parser.error("--changes cannot be combined with --rebuild (a rebuild already embeds every pair)")
+
+    if args.rebuild:
         try:
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text[:6000],
-                task_type="retrieval_document"
-            )
-            embeddings.append(result["embedding"])
-        except Exception as e:
-            print(f"⚠️ Skipping one text due to error: {e}")
-            embeddings.append([0]*768)
-    return embeddings
-
-# --- Build Vector Store for Web Data ---
-batch_size = 10
-for i in tqdm(range(0, len(data), batch_size), desc="Building QnA Vector Store"):
-    batch = data[i:i+batch_size]
-
-    faq_texts = [
-    f"Q: {q['question']}; A: {q['answer']}"
-    for q in batch
-]
-
-    questions = [item["question"] for item in batch]
-    answers = [item["answer"]for item in batch]
-    faq_metadatas = [
-        {
-            "source": "faq",
-            "question": q["question"],
-            "answer": q["answer"]
-        }
-        for q in batch
-    ]
-
-    ids = [f"Q{i+j}" for j in range(len(batch))]
-
-    embeddings = get_gemini_embeddings(faq_texts)
-
-    collection.add(
-        ids=ids,
-        embeddings=embeddings,
-        documents=faq_texts,
-        metadatas=faq_metadatas
+            chroma_client.delete_collection(COLLECTION_NAME)
+            print(f"🗑️ Dropped collection {COLLECTION_NAME}.")
+        except Exception:
+            pass
+
+    collection = chroma_client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        metadata={"source": "qna_data"}
     )
 
-print("✅ Gemini-based vector store saved at ./vectorstore_qna_gemini/")
+    provider = get_provider()
+    check_signature(collection, provider)  # never mix vectors from different models
+    engine = EmbeddingEngine(task_type="retrieval_document", provider=provider)
+
+    if args.changes:
+        with open(args.changes, "r", encoding="utf-8") as f:
+            changes = json.load(f)
+        print(f"📄 Loaded change list: {', '.join(f'{len(v)} {k}' for k, v in changes.items())}.")
+        upserted, deleted, failed = apply_changes(collection, changes, engine)
+        if failed:
+            print(f"⚠️ {failed} pairs could not be embedded; keeping {args.changes} so the next run retries them.")
+        else:
+            os.remove(args.changes)
+    else:
+        # --- Load data ---
+        with open(DATA_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        print(f"📄 Loaded {len(data)} qna entries.")
+        upserted, deleted = sync_collection(collection, load_documents(data), engine)
+    record_signature(collection, provider)
+
+    engine.report()  # includes the embedding cache hit rate
+
+    refresh_derived_indexes(chroma_client, upserted or deleted)
+
+    print(f"✅ QnA store synced: {upserted} upserted, {deleted} deleted, "
+          f"{collection.count()} pairs in ./vectorstore_web_gemini/")
@@ -0,0 +1,143 @@
+import os
+import re
+import json
+import datetime
+from utils.relevance import relevance_from_text, relevance_from_url, years_in
+
+# === CONFIG ===
+QUERY_FILTERS = os.getenv("RAG_QUERY_FILTERS", "1") != "0"
+
+# Document categories (utils/relevance.py) worth searching for a query topic
+TOPIC_CATEGORIES = {
+    "examination info": ["examination info", "result notice"],
+    "result notice": ["result notice", "examination info"],
+    "admission info": ["admission info"],
+    "placement info": ["placement info"],
+    "university notice": ["university notice", "news/updates"],
+    "news/updates": ["news/updates", "university notice"],
+    "academic content": ["academic content"],
+}
+
+ACADEMIC_YEAR = re.compile(r"(?<!\d)(20\d{2})\s*[-/–]\s*(\d{2}|20\d{2})(?!\d)")
+RELATIVE_YEARS = [
+    (re.compile(r"\b(last|previous|past) (year|session)\b"), -1),
+    (re.compile(r"\b(this|current|present) (year|session)\b"), 0),
+    (re.compile(r"\b(next|coming|upcoming) (year|session)\b"), 1),
+]
+RECENT = re.compile(r"\b(latest|recent|recently|newest|upcoming)\b")
+
+
+def parse_query(user_query, today=None):
+    """Year range and topic a question asks about.
+
+    Returns {"years": (lo, hi) or None, "category": str or None}. Explicit
+    years ("2024", "2024-25") win over relative ones ("last year");
+    "latest"/"upcoming" etc. only ask for documents from the last year on,
+    with no upper bound (hi is None).
+    """
+    today = today or datetime.date.today()
+    q = user_query.lower()
+
+    years = None
+    academic = ACADEMIC_YEAR.search(q)
+    explicit = years_in(q, max_year=today.year + 5)
+    if academic:
+        start = int(academic.group(1))
+        end = academic.group(2)
+        end = int(end) if len(end) == 4 else start // 100 * 100 + int(end)
+        years = (start, max(start, end))
+    elif explicit:
+        years = (explicit[0], explicit[-1])
+    else:
+        for pattern, offset in RELATIVE_YEARS:
+            if pattern.search(q):
+                years = (today.year + offset, today.year + offset)
+                break
+        else:
+            if RECENT.search(q):
+                years = (today.year - 1, None)
+
+    topic = relevance_from_text(q)
+    if topic == "general info":
+        topic = relevance_from_url(q)
+    return {"years": years, "category": topic if topic in TOPIC_CATEGORIES else None}
+
+
+def build_where(parsed):
+    """Chroma `where` clause for igdtuw_web from parse_query() output, or None."""
+    clauses = []
+    if parsed.get("years"):
+        lo, hi = parsed["years"]
+        # Documents store the range of years they mention: [year_min, year]
+        clauses.append({"year": {"$gte": lo}})
+        if hi is not None:
+            clauses.append({"year_min": {"$lte": hi}})
+    if parsed.get("category"):
+        clauses.append({"category": {"$in": TOPIC_CATEGORIES[parsed["category"]]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def query_where(user_query, today=None):
+    return build_where(parse_query(user_query, today)) if QUERY_FILTERS else None
+
+
+def where_key(where):
+    """Hashable, order-independent form of a `where` clause (None stays None)."""
+    return json.dumps(where, sort_keys=True) if where else None
+
+
+def matches(meta, where):
+    """Evaluate the subset of Chroma's `where` syntax that build_where() emits.
+
+    Used by the retrievers that don't go through Chroma (memory index, BM25).
+    """
+    if not where:
+        return True
+    meta = meta or {}
+    if "$and" in where:
+        return all(matches(meta, clause) for clause in where["$and"])
+    if "$or" in where:
+        return any(matches(meta, clause) for clause in where["$or"])
+    for field, cond in where.items():
+        value = meta.get(field)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, target in cond.items():
+            if op == "$eq" and value != target:
+                return False
+            if op == "$ne" and value == target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$nin" and value in target:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+    return True
+
+
+def fill_results(primary, fallback, n_results):
+    """Chroma-style single-query result: `primary` hits first, topped up from `fallback`."""
+    keys = [k for k, v in primary.items() if isinstance(v, list) and v and isinstance(v[0], list) and k in fallback]
+    out = dict(primary, **{k: [list(primary[k][0])] for k in keys})
+    have = set(out["ids"][0])
+    for i, doc_id in enumerate(fallback["ids"][0]):
+        if len(out["ids"][0]) >= n_results:
+            break
+        if doc_id in have:
+            continue
+        have.add(doc_id)
+        for k in keys:
+            out[k][0].append(fallback[k][0][i])
+    return out
@@ -1,44 +1,297 @@
 import os
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import chromadb
 import google.generativeai as genai
+from embedding_engine import configure_gemini, estimate_tokens, is_rate_limit_error, MAX_CHARS, BATCH_SIZE as EMBED_BATCH_SIZE
+from embedding_cache import cache_key, get_default_cache
+from embedding_providers import get_provider, check_signature
+from answer_cache import SemanticAnswerCache
+from context_packer import pack_context
+from query_filters import query_where, where_key, fill_results
+from load_control import Overloaded, SingleFlight, coalesce_key, embed_limiter, generate_limiter
+import metrics
+from metrics import span
 
 # --- Setup ---
+# Importing this module only reads settings; init() opens Chroma, loads the
+# indexes and builds the clients, so a web worker can bind its port and
+# answer /healthz while that runs (app.py calls it from its lifespan).
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
-# Connect to both collections
-chroma_client = chromadb.PersistentClient(path="./vectorstore_web_gemini")
+# Bounded pool for the blocking embed / Chroma / Gemini calls made from async code
+RAG_EXECUTOR_WORKERS = int(os.getenv("RAG_EXECUTOR_WORKERS", "32"))
+rag_executor = ThreadPoolExecutor(max_workers=RAG_EXECUTOR_WORKERS, thread_name_prefix="rag")
+
+# Reuses answers for near-identical questions; ANSWER_CACHE=0 turns it off
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") != "0"
+
+# Top FAQ hit closer than this (Chroma L2 distance, ~2 - 2*cosine) is answered
+# straight from igdtuw_qna without calling Gemini; 0 disables the fast path
+FAQ_FAST_PATH_DISTANCE = float(os.getenv("FAQ_FAST_PATH_DISTANCE", "0.15"))
+
+# The async path starts the web search alongside the FAQ search and drops it
+# on a fast-path hit (its Chroma query still finishes on the executor);
+# SPECULATIVE_WEB_SEARCH=0 waits for the FAQ miss instead
+SPECULATIVE_WEB_SEARCH = os.getenv("SPECULATIVE_WEB_SEARCH", "1") != "0"
+
+# Trim, de-duplicate and budget the prompt context (context_packer.py)
+CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "1") != "0"
+
+# RAG_RERANK=1: over-fetch RERANK_CANDIDATES per collection, rerank them with a
+# local cross-encoder (reranker.py, capped at RERANK_MAX_MS) and keep RERANK_TOP_K
+RAG_RERANK = os.getenv("RAG_RERANK", "0") == "1"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "6"))
+if RAG_RERANK:
+    from reranker import CrossEncoderReranker
+
+# /query/batch and rag_query_batch(): at most this many Gemini generations in flight per batch
+BATCH_GENERATE_CONCURRENCY = int(os.getenv("BATCH_GENERATE_CONCURRENCY", "4"))
+
+GENERATION_MODEL = "gemini-2.0-flash"
+
+# Identical questions arriving while one is being answered wait for that
+# answer instead of calling Gemini again (load_control.SingleFlight)
+COALESCE_QUERIES = os.getenv("COALESCE_QUERIES", "1") != "0"
+single_flight = SingleFlight()
+
+# RAG_RETRIEVER=memory searches a memory-mapped, quantized snapshot of both
+# collections (memory_index.py) instead of making two Chroma queries per
+# request; every worker on the box shares one copy through the page cache
+RAG_RETRIEVER = os.getenv("RAG_RETRIEVER", "chroma")
+if RAG_RETRIEVER == "memory":
+    from memory_index import MemoryIndex, ensure_snapshot, current_version
+
+# RAG_RETRIEVAL_MODE: "hybrid" fuses BM25 with dense results, "dense" is
+# embeddings only, "lexical" never embeds the query. Without a BM25 index
+# (bm25_index.py) hybrid behaves like dense.
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid")
+QUERY_EMBED_TIMEOUT = float(os.getenv("QUERY_EMBED_TIMEOUT", "5"))
+if RAG_RETRIEVAL_MODE in ("hybrid", "lexical"):
+    from bm25_index import BM25Index, reciprocal_rank_fusion, INDEX_PATH as BM25_PATH
+
+# Running workers pick up a re-exported snapshot / rebuilt BM25 index: every
+# INDEX_RELOAD_CHECK seconds a request checks the files and, if a sync script
+# replaced them, they are reloaded in the background (the old ones keep serving)
+INDEX_RELOAD_CHECK_SECONDS = float(os.getenv("INDEX_RELOAD_CHECK", "5"))
+
+# Set by init()
+chroma_client = None
+collection_web = None
+collection_faq = None
+embedding_provider = None
+embedding_cache = None
+answer_cache = None
+generation_model = None
+reranker = None
+memory_index = None
+bm25 = None
+bm25_signature = None
+
+ready = False
+init_error = None
+startup_timings = {}
+_init_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_reload_checked = 0.0
+
+
+def init(warm=True):
+    """Open the store, load the indexes and build the clients once; later calls return at once.
+
+    Thread-safe: concurrent callers wait for the first one. `warm` also runs
+    warm_up(). A failed init leaves `init_error` set and is retried next call.
+    """
+    global chroma_client, collection_web, collection_faq, embedding_provider, embedding_cache
+    global answer_cache, generation_model, reranker, memory_index, bm25, bm25_signature, ready, init_error
+    if ready:
+        return
+    with _init_lock:
+        if ready:
+            return
+        started = time.perf_counter()
+        try:
+            import chromadb     # the slowest import here; deferred so the app binds its port first
+
+            configure_gemini()
+            embedding_cache = get_default_cache()
+            answer_cache = SemanticAnswerCache() if ANSWER_CACHE else None
+            generation_model = genai.GenerativeModel(GENERATION_MODEL)
+            if RAG_RERANK:
+                reranker = CrossEncoderReranker()
+
+            # Connect to both collections
+            chroma_client = chromadb.PersistentClient(path="./vectorstore_web_gemini")
+            collection_web = chroma_client.get_or_create_collection("igdtuw_web")
+            collection_faq = chroma_client.get_or_create_collection("igdtuw_qna")
+
+            # Query vectors must come from the same provider/model/dimension as the index
+            embedding_provider = get_provider()
+            check_signature(collection_web, embedding_provider)
+            check_signature(collection_faq, embedding_provider)
+
+            if RAG_RETRIEVER == "memory":
+                ensure_snapshot(chroma_client)    # one export even when every worker starts at once
+                memory_index = MemoryIndex()
+
+            if RAG_RETRIEVAL_MODE in ("hybrid", "lexical"):
+                bm25_signature = file_signature(BM25_PATH)
+                if bm25_signature:
+                    bm25 = BM25Index.load(BM25_PATH)
+                else:
+                    print(f"⚠️ No BM25 index at {BM25_PATH}; falling back to dense retrieval.")
+            startup_timings["init"] = time.perf_counter() - started
+
+            if warm:
+                warm_started = time.perf_counter()
+                warm_up()
+                startup_timings["warm_up"] = time.perf_counter() - warm_started
+        except Exception as e:
+            init_error = str(e)
+            raise
+        init_error = None
+        ready = True
+        for stage, seconds in startup_timings.items():
+            metrics.stage_seconds.observe(seconds, stage=stage)
+        print(f"✅ RAG ready in {time.perf_counter() - started:.2f}s "
+              f"({', '.join(f'{k} {v:.2f}s' for k, v in startup_timings.items())})")
+
+
+def file_signature(path):
+    """(mtime, size) of `path`, or None; the sync scripts replace index files atomically."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def stale_indexes():
+    """Loaded indexes that a sync script has replaced on disk since."""
+    stale = []
+    if memory_index is not None:
+        version = current_version()
+        if version and os.path.basename(version) != memory_index.version:
+            stale.append("memory")
+    if RAG_RETRIEVAL_MODE in ("hybrid", "lexical") and file_signature(BM25_PATH) not in (None, bm25_signature):
+        stale.append("bm25")
+    return stale
+
+
+def maybe_reload_indexes():
+    """Throttled, cheap check (a stat and a small read); a stale index is
+    reloaded on the executor while requests keep using the loaded one."""
+    global _reload_checked
+    now = time.monotonic()
+    if not ready or now - _reload_checked < INDEX_RELOAD_CHECK_SECONDS or _reload_lock.locked():
+        return
+    _reload_checked = now
+    stale = stale_indexes()
+    if stale:
+        rag_executor.submit(reload_indexes, stale)
+
+
+def reload_indexes(stale):
+    global memory_index, bm25, bm25_signature
+    if not _reload_lock.acquire(blocking=False):
+        return
+    started = time.perf_counter()
+    try:
+        if "memory" in stale:
+            memory_index = MemoryIndex()
+        if "bm25" in stale:
+            signature = file_signature(BM25_PATH)
+            bm25 = BM25Index.load(BM25_PATH)
+            bm25_signature = signature
+        if answer_cache:
+            answer_cache.clear()    # answered from the old index
+        print(f"🔄 Reloaded {', '.join(stale)} index in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"⚠️ Reloading {', '.join(stale)} index failed, keeping the loaded one: {e}")
+    finally:
+        _reload_lock.release()
+
+
+async def init_async(warm=True):
+    """init() without blocking the event loop."""
+    if not ready:
+        await asyncio.get_running_loop().run_in_executor(rag_executor, init, warm)
+
+
+def warm_up():
+    """Page in what the first request would otherwise load: each collection's
+    HNSW index (one query with a stored vector) or the snapshot's pages, and
+    the reranker weights. Gemini is not called, so warming costs no quota."""
+    if memory_index is not None:
+        if len(memory_index):
+            memory_index.query(memory_index.vectors([0]), 1)
+    else:
+        for collection in (collection_web, collection_faq):
+            stored = collection.get(limit=1, include=["embeddings"]).get("embeddings")
+            if stored is not None and len(stored):
+                collection.query(query_embeddings=[stored[0]], n_results=1)
+    if reranker is not None:
+        reranker.rerank("warm up", ["warm up", "warm up"], 1)
 
-collection_web = chroma_client.get_or_create_collection("igdtuw_web")
-collection_faq = chroma_client.get_or_create_collection("igdtuw_qna")
 
 # --- Embedding helper ---
-def get_gemini_embeddings(texts):
-    embeddings = []
-    for text in texts:
+def cached_embeddings(keys):
+    """Embedding cache lookup for the query path; any cache error (e.g. "database
+    is locked" while an indexing script writes) is a miss, never a failed request."""
+    if not embedding_cache:
+        return {}
+    try:
+        return embedding_cache.get_many(keys, touch=False)
+    except Exception as e:
+        print(f"⚠️ Embedding cache lookup failed, treating as a miss: {e}")
+        return {}
+
+
+def cache_embeddings(items):
+    if not embedding_cache:
+        return
+    try:
+        embedding_cache.put_many(items)
+    except Exception as e:
+        print(f"⚠️ Embedding cache write failed: {e}")
+
+
+def get_query_embeddings(texts):
+    """Query embeddings from the configured provider; None where embedding failed or timed out."""
+    texts = [t[:MAX_CHARS] for t in texts]
+    keys = [cache_key(embedding_provider.model, "retrieval_query", t) for t in texts]
+    cached = cached_embeddings(keys)
+    embeddings = [cached.get(k) for k in keys]
+
+    todo = [i for i, e in enumerate(embeddings) if e is None]
+    if todo:
         try:
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text[:6000],
-                task_type="retrieval_query"
-            )
-            embeddings.append(result["embedding"])
+            with span("embed"):
+                vectors = embedding_provider.embed_batch(
+                    [texts[i] for i in todo], "retrieval_query", timeout=QUERY_EMBED_TIMEOUT
+                )
+            for i, vector in zip(todo, vectors):
+                embeddings[i] = list(vector)
         except Exception as e:
+            # A zero vector would retrieve garbage; callers fall back to lexical search
+            metrics.upstream_errors_total.inc(service="embed")
             print(f"⚠️ Embedding failed: {e}")
-            embeddings.append([0] * 768)
+        else:
+            cache_embeddings([(keys[i], embeddings[i]) for i in todo])
     return embeddings
 
 
-# --- RAG Query ---
-def rag_query(user_query, n_results=5):
-    query_emb = get_gemini_embeddings([user_query])[0]
+# Older name, kept for callers that import it
+get_gemini_embeddings = get_query_embeddings
 
-    # Query both collections
-    res_web = collection_web.query(query_embeddings=[query_emb], n_results=n_results)
-    res_faq = collection_faq.query(query_embeddings=[query_emb], n_results=n_results)
 
-    # Combine results
+# --- Pipeline stages ---
+def combine_results(res_web, res_faq):
+    """Flatten both Chroma results into parallel lists of docs and sources."""
     all_docs = []
     all_sources = []
 
@@ -50,10 +303,37 @@ def rag_query(user_query, n_results=5):
         all_docs.append(doc)
         all_sources.append(meta.get("answer"))
 
+    return all_docs, all_sources
+
+
+def build_context(user_query, all_docs, all_sources):
+    """Token-budgeted, de-duplicated context (CONTEXT_PACKING=0 restores the raw join)."""
+    metrics.context_docs.observe(len(all_docs), phase="retrieved")
+    if not CONTEXT_PACKING:
+        metrics.context_docs.observe(min(len(all_docs), 11), phase="packed")
+        combined_docs = "\n\n---\n\n".join(all_docs[:11])
+        combined_sources = "\n\n---\n\n".join(all_sources[:11])
+        return f"{combined_docs}\n\n---\n\n{combined_sources}"
+
+    context, stats = pack_context(user_query, all_docs[:11], all_sources[:11])
+    metrics.context_docs.observe(stats["blocks_out"], phase="packed")
+    print(f"✂️ Context: {stats['blocks_out']}/{stats['blocks_in']} blocks, "
+          f"{stats['duplicates_dropped']} near-duplicates dropped, "
+          f"{stats['tokens_before']} → {stats['tokens_after']} tokens (saved {stats['tokens_saved']})")
+    return context
+
+
+def build_prompt(user_query, all_docs, all_sources):
+    with span("prompt"):
+        prompt = prompt_template(user_query, all_docs, all_sources)
+    metrics.prompt_chars.observe(len(prompt))
+    metrics.prompt_tokens.observe(estimate_tokens(prompt))
+    return prompt
+
+
+def prompt_template(user_query, all_docs, all_sources):
     # Build context for Gemini
-    combined_docs = "\n\n---\n\n".join(all_docs[:11])
-    combined_sources = "\n\n---\n\n".join(all_sources[:11])
-    combined_context = f"{combined_docs}\n\n---\n\n{combined_sources}"
+    combined_context = build_context(user_query, all_docs, all_sources)
 
     prompt = f"""
 You are "IGDTUW Assist", an AI assistant built to help students, applicants, and faculty of 
@@ -106,9 +386,561 @@ User question: {user_query}
 Answer:
 
 """
+    return prompt
+
+
+def generate(prompt):
+    try:
+        with span("generate"):
+            response = generation_model.generate_content(prompt)
+    except Exception:
+        metrics.upstream_errors_total.inc(service="generate")
+        raise
+    return response.text
+
+
+def generate_stream(prompt):
+    """Yield answer text chunks as Gemini produces them."""
+    try:
+        for chunk in generation_model.generate_content(prompt, stream=True):
+            # .text raises on a chunk with no parts (e.g. the final safety / finish-reason chunk)
+            if chunk.candidates and chunk.parts and chunk.text:
+                yield chunk.text
+    except Exception:
+        metrics.upstream_errors_total.inc(service="generate")
+        raise
+
+
+# --- RAG Query ---
+def make_result(answer, sources, answered_from="rag"):
+    """`answered_from` is "rag", "faq" (fast path, no LLM call) or "cache"."""
+    return {"answer": answer, "sources": sources, "answered_from": answered_from}
+
+
+def served(result):
+    """Count `result` in rag_answers_total once per caller it is returned to."""
+    metrics.answers_total.inc(answered_from=result["answered_from"])
+    return result
+
+
+def cached_answer(query_emb, where=None):
+    if answer_cache is None or query_emb is None:
+        return None
+    with span("answer_cache"):
+        hit = answer_cache.lookup(query_emb, scope=where_key(where))
+    return make_result(hit["answer"], hit["sources"], "cache") if hit else None
+
+
+def remember_answer(query_emb, answer, sources, where=None):
+    if answer_cache and query_emb is not None:
+        answer_cache.store(query_emb, answer, sources, scope=where_key(where))
+
+
+def faq_fast_path(res_faq):
+    """Return the stored FAQ answer when the top FAQ hit is close enough, else None."""
+    distances = res_faq.get("distances") or [[]]
+    if not distances[0] or distances[0][0] >= FAQ_FAST_PATH_DISTANCE:
+        return None
+    meta = res_faq["metadatas"][0][0] or {}
+    if not meta.get("answer"):
+        return None
+    return make_result(meta["answer"], [meta["answer"]], "faq")
+
+
+def query_collection(collection, stage, **kwargs):
+    """collection.query() timed as `stage`, with failures counted per collection."""
+    try:
+        with span(stage):
+            return collection.query(**kwargs)
+    except Exception:
+        metrics.upstream_errors_total.inc(service=collection.name)
+        raise
+
+
+def search_faq(query_emb, n_results=5):
+    return query_collection(collection_faq, "faq_search", query_embeddings=[query_emb], n_results=n_results)
+
+
+def search_web(query_emb, n_results=5, where=None):
+    """igdtuw_web search narrowed by `where` (the query's year/topic).
+
+    If the filter leaves fewer than `n_results` hits, they are topped up
+    from an unfiltered search, so a wrong guess costs latency, not recall.
+    """
+    if not where:
+        return query_collection(collection_web, "web_search", query_embeddings=[query_emb], n_results=n_results)
+    res = query_collection(collection_web, "web_search", query_embeddings=[query_emb], n_results=n_results, where=where)
+    if len(res["ids"][0]) >= n_results:
+        return res
+    unfiltered = query_collection(collection_web, "web_search", query_embeddings=[query_emb], n_results=n_results)
+    return fill_results(res, unfiltered, n_results)
+
+
+def search_memory_index(query_emb, n_results=5, where=None):
+    """Both collections in one in-memory pass; returns (res_web, res_faq)."""
+    with span("memory_search"):
+        return _search_memory_index(query_emb, n_results, where)
+
+
+def _search_memory_index(query_emb, n_results, where):
+    results = memory_index.query([query_emb], n_results, where={"igdtuw_web": where} if where else None)
+    res_web = results["igdtuw_web"]
+    if where and len(res_web["ids"][0]) < n_results:
+        unfiltered = memory_index.query([query_emb], n_results, collections=("igdtuw_web",))["igdtuw_web"]
+        res_web = fill_results(res_web, unfiltered, n_results)
+    return res_web, results["igdtuw_qna"]
+
+
+def lexical_only(query_emb):
+    return bm25 is not None and (query_emb is None or RAG_RETRIEVAL_MODE == "lexical")
+
+
+def lexical_search(user_query, n_results=5, where=None):
+    """BM25 over both collections; no embedding round trip at all."""
+    with span("lexical_search"):
+        return _lexical_search(user_query, n_results, where)
+
+
+def _lexical_search(user_query, n_results, where):
+    lex_web = bm25.search(user_query, n_results, collection="igdtuw_web", where=where)
+    if where and len(lex_web["ids"][0]) < n_results:
+        lex_web = fill_results(lex_web, bm25.search(user_query, n_results, collection="igdtuw_web"), n_results)
+    return lex_web, bm25.search(user_query, n_results, collection="igdtuw_qna")
+
+
+def fuse_lexical(user_query, res_web, res_faq, n_results=5, where=None):
+    """Reciprocal rank fusion of dense results with BM25 (no-op without an index)."""
+    if bm25 is None:
+        return res_web, res_faq
+    lex_web, lex_faq = lexical_search(user_query, n_results, where)
+    return (
+        reciprocal_rank_fusion(res_web, lex_web, n_results),
+        reciprocal_rank_fusion(res_faq, lex_faq, n_results),
+    )
+
+
+def fetch_count(n_results):
+    return max(n_results, RERANK_CANDIDATES) if reranker else n_results
+
+
+def result_sizes(*results):
+    """Docs per result, i.e. the slices combine_results() lays out back to back."""
+    return [len(res["documents"][0]) for res in results]
+
+
+def rerank_candidates(user_query, all_docs, all_sources, groups=None):
+    """Keep the cross-encoder's top RERANK_TOP_K (no-op when reranking is off).
+
+    `groups` (see result_sizes) lets a capped rerank score web and FAQ
+    candidates alternately instead of web first.
+    """
+    if reranker is None or len(all_docs) <= RERANK_TOP_K:
+        return all_docs, all_sources
+    with span("rerank"):
+        order, scored = reranker.rerank(user_query, all_docs, RERANK_TOP_K, groups=groups)
+    if scored < len(all_docs):
+        print(f"⏱️ Rerank hit its {reranker.max_ms:.0f}ms cap after {scored}/{len(all_docs)} candidates")
+    return [all_docs[i] for i in order], [all_sources[i] for i in order]
+
+
+def retrieve(user_query, query_emb, n_results=5, where=None):
+    """Returns (fast_result, all_docs, all_sources); fast_result is set when the FAQ fast path fires.
+
+    `where` (see query_filters.py) narrows the web search; the FAQ collection is never filtered.
+    """
+    n_results = fetch_count(n_results)
+    if lexical_only(query_emb):
+        res_web, res_faq = lexical_search(user_query, n_results, where)
+        all_docs, all_sources = combine_results(res_web, res_faq)
+        return (None, *rerank_candidates(user_query, all_docs, all_sources, result_sizes(res_web, res_faq)))
+    if query_emb is None:
+        raise RuntimeError("Query embedding failed and no BM25 index is available.")
+
+    if memory_index:
+        res_web, res_faq = search_memory_index(query_emb, n_results, where)
+        fast = faq_fast_path(res_faq)
+        if fast:
+            return fast, None, None
+    else:
+        # FAQ first: a confident match skips the web search and the LLM entirely
+        res_faq = search_faq(query_emb, n_results)
+        fast = faq_fast_path(res_faq)
+        if fast:
+            return fast, None, None
+        res_web = search_web(query_emb, n_results, where)
+
+    res_web, res_faq = fuse_lexical(user_query, res_web, res_faq, n_results, where)
+    all_docs, all_sources = combine_results(res_web, res_faq)
+    return (None, *rerank_candidates(user_query, all_docs, all_sources, result_sizes(res_web, res_faq)))
+
+
+def answer_query(user_query, n_results=5):
+    """Full pipeline; returns a make_result() dict."""
+    init()
+    maybe_reload_indexes()
+    query_emb = None
+    if RAG_RETRIEVAL_MODE != "lexical" or bm25 is None:
+        query_emb = get_query_embeddings([user_query])[0]
+
+    where = query_where(user_query)
+    hit = cached_answer(query_emb, where)
+    if hit:
+        return served(hit)
+
+    fast, all_docs, all_sources = retrieve(user_query, query_emb, n_results, where)
+    if fast:
+        return served(fast)
+
+    prompt = build_prompt(user_query, all_docs, all_sources)
+    answer = generate(prompt)
+    remember_answer(query_emb, answer, all_sources, where)
+    return served(make_result(answer, all_sources))
+
+
+def rag_query(user_query, n_results=5):
+    result = answer_query(user_query, n_results)
+    return result["answer"], result["sources"]
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the bounded RAG executor without stalling the event loop.
+
+    The call sees the caller's contextvars, so its spans land in the request's Server-Timing.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(rag_executor, lambda: ctx.run(func, *args, **kwargs))
+
+
+async def embed_async(texts):
+    """get_query_embeddings() under the process-wide embed limiter."""
+    async with embed_limiter.slot():
+        return await run_blocking(get_query_embeddings, texts)
+
+
+async def embed_query_async(user_query):
+    if RAG_RETRIEVAL_MODE == "lexical" and bm25 is not None:
+        return None
+    return (await embed_async([user_query]))[0]
+
+
+def rate_limited():
+    """Gemini's 429 as Overloaded, so callers get a 503 + Retry-After rather than a 500."""
+    metrics.shed_total.inc(upstream="gemini_429")
+    return Overloaded("Gemini rate limit reached")
+
+
+async def generate_async(prompt):
+    """generate() under the process-wide generate limiter."""
+    async with generate_limiter.slot():
+        try:
+            return await run_blocking(generate, prompt)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                raise rate_limited() from e
+            raise
+
+
+async def retrieve_async(user_query, query_emb, n_results=5, where=None):
+    """Async retrieve(); returns (fast_result, all_docs, all_sources).
+
+    The two collection searches run concurrently; on a fast-path hit the
+    web result is dropped. SPECULATIVE_WEB_SEARCH=0 starts the web search
+    only after the FAQ search missed, trading latency for Chroma load.
+    """
+    if lexical_only(query_emb) or memory_index:
+        # Both are in-process and fast; no need to split them across threads
+        fast, all_docs, all_sources = await run_blocking(retrieve, user_query, query_emb, n_results, where)
+        return (fast, [], []) if fast else (None, all_docs, all_sources)
+    if query_emb is None:
+        raise RuntimeError("Query embedding failed and no BM25 index is available.")
+
+    n_results = fetch_count(n_results)
+    speculative = SPECULATIVE_WEB_SEARCH or FAQ_FAST_PATH_DISTANCE <= 0
+    web_task = asyncio.ensure_future(run_blocking(search_web, query_emb, n_results, where)) if speculative else None
+    try:
+        res_faq = await run_blocking(search_faq, query_emb, n_results)
+    except BaseException:
+        if web_task:
+            web_task.cancel()
+        raise
+    fast = faq_fast_path(res_faq)
+    if fast:
+        if web_task:
+            web_task.cancel()   # only drops the result; the executor job runs to completion
+        return fast, [], []
+    res_web = await (web_task or run_blocking(search_web, query_emb, n_results, where))
+    # BM25 scoring is CPU work; keep it off the event loop
+    res_web, res_faq = await run_blocking(fuse_lexical, user_query, res_web, res_faq, n_results, where)
+    all_docs, all_sources = combine_results(res_web, res_faq)
+    all_docs, all_sources = await run_blocking(
+        rerank_candidates, user_query, all_docs, all_sources, result_sizes(res_web, res_faq)
+    )
+    return None, all_docs, all_sources
+
+
+async def answer_query_async(user_query, n_results=5):
+    """Same as answer_query, but awaitable; blocking work runs on the RAG executor.
+
+    Concurrent calls for the same question share one computation (COALESCE_QUERIES).
+    May raise Overloaded when the embed / generate queues are full.
+    """
+    await init_async()
+    maybe_reload_indexes()
+    if not COALESCE_QUERIES:
+        return served(await _answer_query_async(user_query, n_results))
+    # Counted per caller, so a coalesced follower is an answer served too
+    return served(await single_flight.do(
+        coalesce_key(user_query, n_results), _answer_query_async, user_query, n_results
+    ))
+
+
+async def _answer_query_async(user_query, n_results):
+    query_emb = await embed_query_async(user_query)
+    where = query_where(user_query)
+    hit = cached_answer(query_emb, where)
+    if hit:
+        return hit
+
+    fast, all_docs, all_sources = await retrieve_async(user_query, query_emb, n_results, where)
+    if fast:
+        return fast
+
+    # Context packing (tokenize, shingle, Jaccard) is CPU work; keep it off the event loop
+    prompt = await run_blocking(build_prompt, user_query, all_docs, all_sources)
+    answer = await generate_async(prompt)
+    remember_answer(query_emb, answer, all_sources, where)
+    return make_result(answer, all_sources)
+
+
+async def rag_query_async(user_query, n_results=5):
+    result = await answer_query_async(user_query, n_results)
+    return result["answer"], result["sources"]
+
+
+async def rag_query_stream(user_query, n_results=5):
+    """Async generator of ("sources", list), ("token", text)... events.
+
+    The first event is ("answered_from", "rag" | "faq" | "cache").
+    """
+    await init_async()
+    maybe_reload_indexes()
+    query_emb = await embed_query_async(user_query)
+    where = query_where(user_query)
+    hit = cached_answer(query_emb, where)
+    if not hit:
+        hit, all_docs, all_sources = await retrieve_async(user_query, query_emb, n_results, where)
+    if hit:
+        served(hit)
+        yield "answered_from", hit["answered_from"]
+        yield "sources", hit["sources"]
+        yield "token", hit["answer"]
+        return
+
+    metrics.answers_total.inc(answered_from="rag")
+    yield "answered_from", "rag"
+    yield "sources", all_sources
+
+    prompt = await run_blocking(build_prompt, user_query, all_docs, all_sources)
+    queue = asyncio.Queue()
+    producer = asyncio.ensure_future(drain_stream(prompt, queue))
+    parts = []
+    try:
+        while (chunk := await queue.get()) is not None:
+            parts.append(chunk)
+            yield "token", chunk
+        await producer      # re-raises a failed generation
+    finally:
+        producer.cancel()   # the client went away: stop pulling and free the slot
+    remember_answer(query_emb, "".join(parts), all_sources, where)
+
+
+async def drain_stream(prompt, queue):
+    """Put generate_stream(prompt) chunks on `queue`, then None.
+
+    The generate slot is held only while Gemini produces, not while a slow
+    client reads the tokens.
+    """
+    try:
+        async with generate_limiter.slot():
+            chunks = generate_stream(prompt)
+            started = time.perf_counter()
+            first = True
+            while True:
+                # Each next() blocks on the network, so pull chunks on the executor
+                try:
+                    chunk = await run_blocking(next, chunks, None)
+                except Exception as e:
+                    if is_rate_limit_error(e):
+                        raise rate_limited() from e
+                    raise
+                if chunk is None:
+                    break
+                if first:
+                    metrics.record("first_token", time.perf_counter() - started)
+                    first = False
+                queue.put_nowait(chunk)
+            metrics.record("generate", time.perf_counter() - started)
+    finally:
+        queue.put_nowait(None)
+
+
+# --- Batch queries (regression sets, bulk imports) ---
+def split_result(res, i):
+    """Query `i` of a multi-query Chroma result, as a single-query result."""
+    return {k: [v[i]] for k, v in res.items() if isinstance(v, list) and v and isinstance(v[0], list)}
+
+
+def query_collection_batch(name, query_embs, n_results, where=None):
+    """One multi-query search of `name`; returns a single-query result per embedding."""
+    if memory_index:
+        res = memory_index.query(query_embs, n_results, collections=(name,),
+                                 where={name: where} if where else None)[name]
+    else:
+        collection, stage = (collection_web, "web_search") if name == "igdtuw_web" else (collection_faq, "faq_search")
+        res = query_collection(collection, stage, query_embeddings=query_embs, n_results=n_results,
+                               **({"where": where} if where else {}))
+    return [split_result(res, j) for j in range(len(query_embs))]
+
+
+def search_web_batch(query_embs, n_results, wheres):
+    """igdtuw_web results for many queries: one multi-query call per distinct filter."""
+    results = [None] * len(query_embs)
+    groups = {}
+    for i, where in enumerate(wheres):
+        groups.setdefault(where_key(where), []).append(i)
+    for idx in groups.values():
+        found = query_collection_batch("igdtuw_web", [query_embs[i] for i in idx], n_results, wheres[idx[0]])
+        for i, res in zip(idx, found):
+            results[i] = res
+
+    # Same top-up as search_web(), batched across every query the filter left short
+    short = [i for i, where in enumerate(wheres) if where and len(results[i]["ids"][0]) < n_results]
+    if short:
+        unfiltered = query_collection_batch("igdtuw_web", [query_embs[i] for i in short], n_results)
+        for i, res in zip(short, unfiltered):
+            results[i] = fill_results(results[i], res, n_results)
+    return results
+
+
+def retrieve_batch(user_queries, query_embs, n_results=5, wheres=None):
+    """retrieve() for many queries at once; returns one (fast, docs, sources) tuple or Exception per query.
+
+    Queries with an embedding share one FAQ search and one web search per
+    distinct filter; the rest go through retrieve() one by one (BM25 fallback).
+    """
+    wheres = wheres or [None] * len(user_queries)
+    n = fetch_count(n_results)
+    out = [None] * len(user_queries)
+
+    dense = [i for i, emb in enumerate(query_embs) if emb is not None and not lexical_only(emb)]
+    dense_set = set(dense)
+    for i in range(len(user_queries)):
+        if i not in dense_set:
+            try:
+                out[i] = retrieve(user_queries[i], query_embs[i], n_results, wheres[i])
+            except Exception as e:
+                out[i] = e
+    if not dense:
+        return out
+
+    try:
+        faq = dict(zip(dense, query_collection_batch("igdtuw_qna", [query_embs[i] for i in dense], n)))
+        web_needed = []
+        for i in dense:
+            fast = faq_fast_path(faq[i])
+            if fast:
+                out[i] = (fast, None, None)
+            else:
+                web_needed.append(i)
+        web = dict(zip(web_needed, search_web_batch(
+            [query_embs[i] for i in web_needed], n, [wheres[i] for i in web_needed]
+        ))) if web_needed else {}
+    except Exception as e:
+        for i in dense:
+            if out[i] is None:
+                out[i] = e
+        return out
+
+    for i in web_needed:
+        try:
+            res_web, res_faq = fuse_lexical(user_queries[i], web[i], faq[i], n, wheres[i])
+            all_docs, all_sources = combine_results(res_web, res_faq)
+            out[i] = (None, *rerank_candidates(user_queries[i], all_docs, all_sources, result_sizes(res_web, res_faq)))
+        except Exception as e:
+            out[i] = e
+    return out
+
+
+async def answer_queries_async(user_queries, n_results=5, concurrency=BATCH_GENERATE_CONCURRENCY):
+    """Answer a list of questions; results come back in input order.
+
+    Embedding is one batched call, retrieval uses multi-query searches, and
+    at most `concurrency` generations run at a time. Each item is either
+    {"query", "answer", "sources", "answered_from"} or {"query", "error"};
+    one failing question never fails the batch.
+    """
+    await init_async()
+    maybe_reload_indexes()
+    results = [None] * len(user_queries)
+    todo = []
+    for i, user_query in enumerate(user_queries):
+        if isinstance(user_query, str) and user_query.strip():
+            todo.append(i)
+        else:
+            results[i] = {"query": user_query, "error": "Missing query"}
+    if not todo:
+        return results
+
+    queries = [user_queries[i] for i in todo]
+    if RAG_RETRIEVAL_MODE == "lexical" and bm25 is not None:
+        embeddings = [None] * len(queries)
+    else:
+        embeddings = []
+        for start in range(0, len(queries), EMBED_BATCH_SIZE):
+            embeddings += await embed_async(queries[start:start + EMBED_BATCH_SIZE])
+    wheres = [query_where(q) for q in queries]
+
+    hits = [cached_answer(emb, where) for emb, where in zip(embeddings, wheres)]
+    pending = [j for j, hit in enumerate(hits) if hit is None]
+    retrieved = dict(zip(pending, await run_blocking(
+        retrieve_batch,
+        [queries[j] for j in pending], [embeddings[j] for j in pending], n_results, [wheres[j] for j in pending],
+    )))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def finish(j):
+        user_query = queries[j]
+        if hits[j]:
+            return {"query": user_query, **served(hits[j])}
+        found = retrieved[j]
+        if isinstance(found, Exception):
+            return {"query": user_query, "error": str(found)}
+        fast, all_docs, all_sources = found
+        if fast:
+            return {"query": user_query, **served(fast)}
+        try:
+            prompt = await run_blocking(build_prompt, user_query, all_docs, all_sources)
+            async with semaphore:
+                answer = await generate_async(prompt)
+        except Exception as e:
+            return {"query": user_query, "error": str(e)}
+        remember_answer(embeddings[j], answer, all_sources, wheres[j])
+        return {"query": user_query, **served(make_result(answer, all_sources))}
+
+    for i, result in zip(todo, await asyncio.gather(*(finish(j) for j in range(len(queries))))):
+        results[i] = result
+    return results
 
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
 
-    return response.text, all_sources
+def rag_query_batch(user_queries, n_results=5, concurrency=BATCH_GENERATE_CONCURRENCY):
+    """Blocking wrapper around answer_queries_async() for scripts.
 
+    Inside a running event loop (Jupyter, FastAPI) await answer_queries_async() instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(answer_queries_async(user_queries, n_results, concurrency))
+    raise RuntimeError("rag_query_batch() cannot run inside an event loop; use `await answer_queries_async(...)`.")
@@ -0,0 +1,60 @@
+import os
+import time
+
+# === CONFIG ===
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+RERANK_MAX_MS = float(os.getenv("RERANK_MAX_MS", "150"))
+RERANK_MAX_CHARS = 1500     # the cross-encoder only reads ~512 tokens anyway
+
+
+def interleave(*sizes):
+    """Round-robin index order over consecutive groups of the given sizes."""
+    offsets = [sum(sizes[:g]) for g in range(len(sizes))]
+    return [offsets[g] + i for i in range(max(sizes, default=0)) for g in range(len(sizes)) if i < sizes[g]]
+
+
+class CrossEncoderReranker:
+    """CPU cross-encoder rerank with a soft latency cap.
+
+    Candidates are scored in batches, round-robin across `groups` (the
+    per-collection result lists), so a cap hit never leaves one collection
+    entirely unscored. Once the next batch would overrun `max_ms` (judged by
+    the slowest batch so far), the remaining candidates are left unscored
+    and keep that order behind the scored ones. The first batch always
+    runs, so a cold model can still overshoot the cap once.
+    """
+
+    def __init__(self, model=RERANK_MODEL, batch_size=RERANK_BATCH_SIZE, max_ms=RERANK_MAX_MS, device="cpu"):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model
+        self.batch_size = batch_size
+        self.max_ms = max_ms
+        self.model = CrossEncoder(model, device=device)
+
+    def rerank(self, query, docs, top_k, max_ms=None, groups=None):
+        """Return (indices of the best `top_k` docs, number of docs actually scored).
+
+        `groups` are the sizes of the consecutive per-collection slices of
+        `docs` (e.g. web then FAQ); without it docs are scored in order.
+        """
+        max_ms = self.max_ms if max_ms is None else max_ms
+        order = interleave(*groups) if groups else list(range(len(docs)))
+        started = time.perf_counter()
+        scores = {}
+        slowest = 0.0
+        for start in range(0, len(order), self.batch_size):
+            elapsed = (time.perf_counter() - started) * 1000
+            if scores and elapsed + slowest > max_ms:
+                break
+            batch_started = time.perf_counter()
+            batch = order[start:start + self.batch_size]
+            pairs = [(query, (docs[i] or "")[:RERANK_MAX_CHARS]) for i in batch]
+            for i, score in zip(batch, self.model.predict(pairs, batch_size=self.batch_size)):
+                scores[i] = float(score)
+            slowest = max(slowest, (time.perf_counter() - batch_started) * 1000)
+
+        scored = sorted(scores, key=scores.get, reverse=True)
+        unscored = [i for i in order if i not in scores]
+        return (scored + unscored)[:top_k], len(scores)
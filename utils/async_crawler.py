@@ -0,0 +1,389 @@
+import os
+import time
+import asyncio
+import argparse
+from urllib.parse import urljoin, urlparse, urlunparse
+import httpx
+from bs4 import BeautifulSoup
+from igdtuw_crawler import BASE_URL, SAVE_PATH, pages_to_check, relevance_from_url, clean_page_text
+from crawl_state import CrawlState, content_hash, STATE_PATH
+from jsonl_io import JsonlWriter, write_jsonl
+
+# === CONFIG ===
+CONCURRENCY = 16            # requests in flight overall
+PER_HOST = 4                # requests in flight per host
+HOST_DELAY = 0.25           # seconds between request starts on one host
+TIMEOUT = 15
+MAX_TEXT_CHARS = 10000
+MIN_TEXT_CHARS = 200        # less than this usually means the page is rendered by JS
+USER_AGENT = "IGDTUW-Assist-Crawler/1.0 (+https://www.igdtuw.ac.in)"
+
+
+def normalize_url(url):
+    """Canonical form, used for dedup and as the crawled / emitted URL (so record IDs are stable).
+
+    No fragment, lowercase host, no default port or trailing slash.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "https"
+    netloc = parsed.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parsed.path or "/"
+    if path != "/" and path.endswith("/"):
+        path = path.rstrip("/")
+    return urlunparse((scheme, netloc, path, "", parsed.query, ""))
+
+
+def is_pdf(url):
+    """Judged on the path, so "notice.pdf#page=2" and "notice.pdf?v=3" are PDFs too."""
+    return urlparse(url).path.lower().endswith(".pdf")
+
+
+def host_key(netloc):
+    return netloc.lower().removeprefix("www.")
+
+
+def needs_javascript(text):
+    t = text.lower()
+    return len(text) < MIN_TEXT_CHARS or "enable javascript" in t or "javascript is required" in t
+
+
+def parse_page(html, page_url):
+    """Title, cleaned text, and outgoing links (resolved) of one HTML page."""
+    soup = BeautifulSoup(html, "html.parser")
+    title_tag = soup.find("title")
+    page_title = title_tag.get_text(strip=True) if title_tag else "No title"
+    links = [
+        (link["href"].strip(), link.get_text(strip=True))
+        for link in soup.find_all("a", href=True)
+        if link["href"].strip()
+    ]
+    page_text = clean_page_text(soup)
+    if len(page_text) > MAX_TEXT_CHARS:
+        page_text = page_text[:MAX_TEXT_CHARS] + "..."
+    resolved = [(urljoin(page_url, href), href, text) for href, text in links]
+    return page_title, page_text, resolved
+
+
+class AsyncCrawler:
+    """Breadth-first crawler with a pooled HTTP client and per-host politeness.
+
+    Produces the same `content_data` records as igdtuw_crawler.py. Pages
+    whose static HTML has no real text are re-rendered with Selenium at the
+    end (unless use_selenium=False).
+
+    With a CrawlState, requests are conditional: a 304 reuses the stored
+    record and links, and only new or changed pages land in `changed`.
+
+    With a `sink` (e.g. a JsonlWriter), records are written out as they are
+    found instead of being collected in `content_data`.
+    """
+
+    def __init__(self, base_url=BASE_URL, max_depth=1, concurrency=CONCURRENCY,
+                 per_host=PER_HOST, host_delay=HOST_DELAY, use_selenium=True, state=None, sink=None):
+        self.base_url = base_url.rstrip("/")
+        self.base_host = host_key(urlparse(self.base_url).netloc)
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.host_delay = host_delay
+        self.use_selenium = use_selenium
+        self.visited = set()
+        self.pdf_seen = set()
+        self.content_data = []
+        self.sink = sink
+        self.emitted = 0
+        self.changed = []
+        self.not_modified = 0
+        self.state = state
+        self.js_pages = []
+        self.host_slots = {}
+        self.host_next = {}
+        self.fetched = 0
+        self.errors = 0
+
+    def is_internal(self, url):
+        return host_key(urlparse(url).netloc) == self.base_host
+
+    async def polite(self, url):
+        """Wait for this host's turn; returns the host's semaphore (already acquired)."""
+        host = host_key(urlparse(url).netloc)
+        slot = self.host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        await slot.acquire()
+        now = time.monotonic()
+        start_at = max(now, self.host_next.get(host, now))
+        self.host_next[host] = start_at + self.host_delay
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+        return slot
+
+    async def fetch(self, client, url, retries=1):
+        slot = await self.polite(url)
+        try:
+            headers = self.state.conditional_headers(url) if self.state else {}
+            for attempt in range(retries + 1):
+                try:
+                    response = await client.get(url, headers=headers)
+                    if response.status_code == 304:
+                        return response
+                    response.raise_for_status()
+                    self.fetched += 1
+                    return response
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    status = getattr(getattr(e, "response", None), "status_code", 0)
+                    if attempt == retries or (400 <= status < 500 and status != 429):
+                        raise
+                    await asyncio.sleep(1 + attempt)
+        finally:
+            slot.release()
+
+    def record_page(self, url, title, text):
+        record = {
+            "url": url,
+            "type": "webpage",
+            "title": title,
+            "relevance_hint": relevance_from_url(url),
+            "text": text
+        }
+        self.emit(record)
+        return record
+
+    def emit(self, record):
+        self.emitted += 1
+        if self.sink is None:
+            self.content_data.append(record)
+        else:
+            self.sink.write(record)
+
+    def record_pdf(self, url, link_text):
+        self.emit({
+            "url": url,
+            "type": "pdf",
+            "title": link_text or "PDF Document",
+            "relevance_hint": relevance_from_url(url),
+            "text": ""
+        })
+
+    def handle_links(self, links, depth, queue):
+        for full_url, href, link_text in links:
+            if is_pdf(full_url):
+                key = normalize_url(full_url)
+                if key not in self.pdf_seen:
+                    self.pdf_seen.add(key)
+                    self.on_pdf(key, link_text)
+            elif self.is_internal(full_url) and depth + 1 <= self.max_depth:
+                self.enqueue(queue, full_url, depth + 1)
+
+    def on_pdf(self, url, link_text):
+        """Hook for discovered PDF links; subclasses can also download them."""
+        self.record_pdf(url, link_text)
+
+    def enqueue(self, queue, url, depth):
+        # Queue the canonical form: whichever variant of a link is found first, the record's URL is the same
+        key = normalize_url(url)
+        if key in self.visited:
+            return
+        self.visited.add(key)
+        queue.put_nowait((key, depth))
+
+    async def visit(self, client, url, depth, queue):
+        print(f"🌐 Scanning (depth {depth}): {url}")
+        try:
+            response = await self.fetch(client, url)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Error scanning {url}: {e}")
+            return
+        await self.process_response(client, url, depth, response, queue)
+
+    async def process_response(self, client, url, depth, response, queue):
+        if response.status_code == 304:
+            stored = self.state.get(url)
+            if stored and stored["record"]:
+                self.not_modified += 1
+                self.state.touch(url)
+                self.emit(stored["record"])
+                self.handle_links(stored["links"], depth, queue)
+                return
+            # Validators without a stored record: fetch the page for real
+            response = await self.refetch(client, url)
+            if response is None:
+                return
+
+        if "html" not in response.headers.get("content-type", "html"):
+            return
+        title, text, links = await asyncio.to_thread(parse_page, response.text, str(response.url))
+        if needs_javascript(text):
+            self.js_pages.append((url, depth))
+        else:
+            record = self.record_page(url, title, text)
+            self.remember(url, response.headers, record, links)
+        self.handle_links(links, depth, queue)
+
+    def remember(self, url, headers, record, links):
+        """Save validators + record; queue the record downstream if it is new or changed."""
+        if self.state is None:
+            self.changed.append(record)
+        elif self.state.update(url, headers, content_hash(record["text"]), record, [list(l) for l in links]):
+            self.changed.append(record)
+
+    async def refetch(self, client, url):
+        """Unconditional GET (no validators sent), on the crawl's shared client."""
+        slot = await self.polite(url)
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            self.fetched += 1
+            return response
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Error scanning {url}: {e}")
+            return None
+        finally:
+            slot.release()
+
+    async def worker(self, client, queue):
+        while True:
+            url, depth = await queue.get()
+            try:
+                await self.visit(client, url, depth, queue)
+            finally:
+                queue.task_done()
+
+    async def run_workers(self, client, queue):
+        workers = [asyncio.create_task(self.worker(client, queue)) for _ in range(self.concurrency)]
+        await queue.join()
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def make_client(self, max_connections=None):
+        max_connections = max_connections or self.concurrency
+        return httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def crawl(self, start_urls, client=None):
+        """Crawl from `start_urls`; pass `client` to share an already open one (it is not closed)."""
+        queue = asyncio.Queue()
+        for url in start_urls:
+            self.enqueue(queue, url, 0)
+
+        if client is None:
+            async with self.make_client() as client:
+                await self.run_workers(client, queue)
+        else:
+            await self.run_workers(client, queue)
+
+        if self.js_pages:
+            if self.use_selenium:
+                await asyncio.to_thread(self.render_with_selenium)
+            else:
+                for url, _ in self.js_pages:
+                    print(f"⚠️ {url} looks JavaScript-rendered; skipped (Selenium fallback disabled).")
+        return self.content_data
+
+    def render_with_selenium(self):
+        """Fallback for pages that really need JavaScript: one shared headless Chrome."""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        print(f"🧭 Rendering {len(self.js_pages)} JavaScript pages with Selenium...")
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        try:
+            for url, depth in self.js_pages:
+                try:
+                    driver.get(url)
+                    WebDriverWait(driver, 10).until(
+                        lambda d: len(d.find_element(By.TAG_NAME, "body").text) >= MIN_TEXT_CHARS
+                    )
+                except Exception as e:
+                    print(f"⚠️ Selenium could not fully render {url}: {e}")
+                title, text, links = parse_page(driver.page_source, url)
+                record = self.record_page(url, title, text)
+                # Rendered pages have no useful validators; change detection is by content hash
+                self.remember(url, {}, record, links)
+                # Links only visible after rendering are recorded but not crawled further
+                for full_url, href, link_text in links:
+                    key = normalize_url(full_url)
+                    if is_pdf(full_url) and key not in self.pdf_seen:
+                        self.pdf_seen.add(key)
+                        self.on_pdf(key, link_text)
+        finally:
+            driver.quit()
+
+
+def changes_path(save_path):
+    root, ext = os.path.splitext(save_path)
+    return root + "_changes" + ext
+
+
+def crawl_igdtuw_async(start_urls=None, save_path=SAVE_PATH, state_path=STATE_PATH, **kwargs):
+    """Drop-in replacement for igdtuw_crawler.crawl_igdtuw().
+
+    `save_path` always gets the full page set (unchanged pages come from the
+    crawl state), so downstream syncs can still detect removed pages. It is
+    written as JSONL while the crawl runs, so later stages can follow it.
+    The new/changed pages alone go to `<save_path>_changes.jsonl`.
+    """
+    state = CrawlState(state_path) if state_path else None
+    started = time.perf_counter()
+    with JsonlWriter(save_path) as sink:
+        crawler = AsyncCrawler(state=state, sink=sink, **kwargs)
+        asyncio.run(crawler.crawl(start_urls or pages_to_check))
+    elapsed = time.perf_counter() - started
+    write_jsonl(changes_path(save_path), crawler.changed)
+
+    print(f"\n✅ Crawling complete. {crawler.emitted} entries saved to {save_path} "
+          f"({crawler.fetched} pages fetched, {crawler.not_modified} not modified, "
+          f"{len(crawler.changed)} new/changed, {crawler.errors} errors, {elapsed:.1f}s).")
+    return crawler.emitted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Async crawl of the IGDTUW site (same output as igdtuw_crawler.py).")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="site root; point at a local server for testing (utils/fake_site_server.py)")
+    parser.add_argument("--start", nargs="*", help="start URLs (default: igdtuw_crawler.pages_to_check)")
+    parser.add_argument("--urls-file", help="file with one start URL per line, e.g. urls.txt")
+    parser.add_argument("--max-depth", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=PER_HOST)
+    parser.add_argument("--host-delay", type=float, default=HOST_DELAY)
+    parser.add_argument("--no-selenium", action="store_true", help="never fall back to headless Chrome")
+    parser.add_argument("--out", default=SAVE_PATH)
+    parser.add_argument("--state", default=STATE_PATH, help="crawl-state database for conditional requests")
+    parser.add_argument("--no-state", action="store_true", help="full crawl without reading or writing crawl state")
+    args = parser.parse_args()
+
+    start_urls = list(args.start or [])
+    if args.urls_file:
+        with open(args.urls_file, "r", encoding="utf-8") as f:
+            start_urls += [line.strip() for line in f if line.strip()]
+    if not start_urls:
+        start_urls = pages_to_check if args.base_url == BASE_URL else [args.base_url + "/"]
+
+    crawl_igdtuw_async(
+        start_urls,
+        save_path=args.out,
+        state_path=None if args.no_state else args.state,
+        base_url=args.base_url,
+        max_depth=args.max_depth,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        host_delay=args.host_delay,
+        use_selenium=not args.no_selenium,
+    )
@@ -1,14 +1,18 @@
-import json
+from jsonl_io import read_jsonl, write_jsonl
 
-with open("web_content.json", "r", encoding="utf-8") as f:
-    web_data = json.load(f)
+stats = {"removed": 0}
 
-# Keep only non-PDF entries
-filtered_data = [item for item in web_data if item["type"] != "pdf"]
 
-print(f"Removed {len(web_data) - len(filtered_data)} PDF entries.")
-print(f"Remaining pages: {len(filtered_data)}")
+def non_pdf(records):
+    # Keep only non-PDF entries
+    for item in records:
+        if item["type"] == "pdf":
+            stats["removed"] += 1
+            continue
+        yield item
 
-with open("web_content_cleaned.json", "w", encoding="utf-8") as f:
-    json.dump(filtered_data, f, indent=4, ensure_ascii=False)
 
+remaining = write_jsonl("web_content_cleaned.jsonl", non_pdf(read_jsonl("web_content.jsonl")))
+
+print(f"Removed {stats['removed']} PDF entries.")
+print(f"Remaining pages: {remaining}")
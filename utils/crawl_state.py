@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# === CONFIG ===
+STATE_PATH = "./igdtuw-data/crawl_state.sqlite3"
+
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class CrawlState:
+    """Per-URL crawl state (SQLite): validators, content hash, and the last extracted record.
+
+    Lets the crawler and the PDF downloader send conditional requests and
+    tell new/changed resources apart from unchanged ones across runs.
+    """
+
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS resources (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                record TEXT,
+                links TEXT,
+                last_checked REAL,
+                last_changed REAL
+            )"""
+        )
+        self.conn.commit()
+        self.seen = set()
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, record, links FROM resources WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        etag, last_modified, digest, record, links = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": digest,
+            "record": json.loads(record) if record else None,
+            "links": json.loads(links) if links else [],
+        }
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since for a URL we have fetched before."""
+        state = self.get(url)
+        headers = {}
+        if state and state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if state and state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def touch(self, url):
+        """A 304: nothing changed, just note that we checked."""
+        self.seen.add(url)
+        with self.lock:
+            self.conn.execute("UPDATE resources SET last_checked = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+
+    def update(self, url, headers, digest, record=None, links=None):
+        """Store a 200 response; returns True if the content is new or changed."""
+        self.seen.add(url)
+        previous = self.get(url)
+        changed = previous is None or previous["content_hash"] != digest
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                """INSERT INTO resources (url, etag, last_modified, content_hash, record, links, last_checked, last_changed)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       etag = excluded.etag,
+                       last_modified = excluded.last_modified,
+                       content_hash = excluded.content_hash,
+                       record = COALESCE(excluded.record, resources.record),
+                       links = COALESCE(excluded.links, resources.links),
+                       last_checked = excluded.last_checked,
+                       last_changed = CASE WHEN resources.content_hash = excluded.content_hash
+                                           THEN resources.last_changed ELSE excluded.last_changed END""",
+                (
+                    url,
+                    headers.get("etag"),
+                    headers.get("last-modified"),
+                    digest,
+                    json.dumps(record, ensure_ascii=False) if record is not None else None,
+                    json.dumps(links, ensure_ascii=False) if links is not None else None,
+                    now,
+                    now,
+                ),
+            )
+            self.conn.commit()
+        return changed
+
+    def close(self):
+        self.conn.close()
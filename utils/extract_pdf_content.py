@@ -1,68 +1,175 @@
 import os
-import json
 import re
+import time
+import sqlite3
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from PyPDF2 import PdfReader
 from tqdm import tqdm  # <-- progress bar
+from jsonl_io import JsonlWriter
+from relevance import relevance_from_text
 
 PDF_DIR = r"igdtuw-data\pdfs"           # Folder containing your PDFs
-SAVE_PATH = r"igdtuw-data\json_data\pdf_texts.json"
-
-def relevance_from_text(text):
-    """Infer relevance from keywords in the text."""
-    t = text.lower()
-    if "exam" in t or "datesheet" in t:
-        return "examination info"
-    elif "admission" in t:
-        return "admission info"
-    elif "placement" in t:
-        return "placement info"
-    elif "result" in t:
-        return "result notice"
-    elif "circular" in t:
-        return "university notice"
-    else:
-        return "general info"
-
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a single PDF file."""
+SAVE_PATH = r"igdtuw-data\json_data\pdf_texts.jsonl"
+CACHE_PATH = "./igdtuw-data/pdf_text_cache.sqlite3"
+MAX_CHARS = 15000                       # text kept per PDF; pages past this are never read
+WORKERS = os.cpu_count() or 1
+SLOWEST_TO_REPORT = 10
+
+def extract_text_from_pdf(pdf_path, max_chars=MAX_CHARS):
+    """Extract text from a single PDF file, stopping once `max_chars` are collected."""
     try:
         reader = PdfReader(pdf_path)
-        text = ""
+        parts = []
+        collected = 0
         for page in reader.pages:
-            page_text = page.extract_text() or ""
-            text += page_text
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
+            page_text = re.sub(r"\s+", " ", page.extract_text() or "")
+            parts.append(page_text)
+            collected += len(page_text)
+            # Joining can merge at most one space per page boundary
+            if max_chars and collected >= max_chars + len(parts):
+                break
+        text = re.sub(r"\s+", " ", "".join(parts)).strip()
+        return text[:max_chars] if max_chars else text
     except Exception as e:
         print(f"⚠️ Error reading {pdf_path}: {e}")
         return ""
 
-def process_pdfs():
-    pdf_files = [f for f in os.listdir(PDF_DIR) if f.lower().endswith(".pdf")]
-    pdf_data = []
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def timed_extract(pdf_path, max_chars=MAX_CHARS):
+    """Worker entry point: (path, text, seconds)."""
+    started = time.perf_counter()
+    text = extract_text_from_pdf(pdf_path, max_chars)
+    return pdf_path, text, time.perf_counter() - started
+
+
+class ExtractionCache:
+    """Extracted text per PDF (SQLite), keyed by path and validated by mtime, then content hash.
+
+    An unchanged mtime/size is trusted without reading the file; otherwise
+    the file is hashed, so a touched-but-identical PDF is still not re-parsed.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS pdf_text (
+                path TEXT PRIMARY KEY,
+                mtime REAL,
+                size INTEGER,
+                content_hash TEXT,
+                max_chars INTEGER,
+                text TEXT
+            )"""
+        )
+        self.conn.commit()
+
+    def lookup(self, path, max_chars):
+        """Return (text or None, content hash if it had to be computed)."""
+        st = os.stat(path)
+        row = self.conn.execute(
+            "SELECT mtime, size, content_hash, max_chars, text FROM pdf_text WHERE path = ?", (path,)
+        ).fetchone()
+        if not row or row[3] != max_chars:
+            return None, None
+        mtime, size, digest, _, text = row
+        if mtime == st.st_mtime and size == st.st_size:
+            return text, None
+        current = file_hash(path)
+        if current != digest:
+            return None, current
+        self.conn.execute("UPDATE pdf_text SET mtime = ?, size = ? WHERE path = ?", (st.st_mtime, st.st_size, path))
+        return text, current
 
-    print(f"📂 Found {len(pdf_files)} PDFs. Starting extraction...\n")
+    def store(self, path, text, max_chars, digest=None):
+        st = os.stat(path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pdf_text (path, mtime, size, content_hash, max_chars, text) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, st.st_mtime, st.st_size, digest or file_hash(path), max_chars, text),
+        )
 
-    for fname in tqdm(pdf_files, desc="Extracting PDFs", unit="file"):
-        full_path = os.path.join(PDF_DIR, fname)
-        text = extract_text_from_pdf(full_path)
-        if not text:
-            continue
+    def commit(self):
+        self.conn.commit()
 
-        title = text[:100].strip() or fname
-        relevance = relevance_from_text(text)
-        pdf_data.append({
-            "path": full_path,
-            "type": "pdf",
-            "title": title[:80],
-            "relevance_hint": relevance,
-            "text": text[:15000]  # truncate large PDFs
-        })
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
 
-    with open(SAVE_PATH, "w", encoding="utf-8") as f:
-        json.dump(pdf_data, f, indent=4, ensure_ascii=False)
 
-    print(f"\n✅ Done. Extracted {len(pdf_data)} PDFs successfully. Saved to {SAVE_PATH}")
+def pdf_record(full_path, text):
+    title = text[:100].strip() or os.path.basename(full_path)
+    relevance = relevance_from_text(text)
+    return {
+        "path": full_path,
+        "type": "pdf",
+        "title": title[:80],
+        "relevance_hint": relevance,
+        "text": text
+    }
+
+def process_pdfs(pdf_dir=PDF_DIR, save_path=SAVE_PATH, cache_path=CACHE_PATH, workers=WORKERS, max_chars=MAX_CHARS):
+    """Write one JSONL record per PDF as soon as its text is available (cached files first)."""
+    pdf_files = sorted(f for f in os.listdir(pdf_dir) if f.lower().endswith(".pdf"))
+    paths = [os.path.join(pdf_dir, fname) for fname in pdf_files]
+    cache = ExtractionCache(cache_path) if cache_path else None
+    timings = []
+
+    with JsonlWriter(save_path) as writer:
+        digests, pending = {}, []
+        for full_path in paths:
+            text, digest = cache.lookup(full_path, max_chars) if cache else (None, None)
+            if text is None:
+                pending.append(full_path)
+                digests[full_path] = digest
+            elif text:
+                writer.write(pdf_record(full_path, text))
+
+        print(f"📂 Found {len(pdf_files)} PDFs ({len(paths) - len(pending)} cached, "
+              f"{len(pending)} to extract with {workers} workers)...\n")
+
+        started = time.perf_counter()
+        if pending:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(timed_extract, path, max_chars) for path in pending]
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Extracting PDFs", unit="file"):
+                    full_path, text, seconds = future.result()
+                    timings.append((seconds, full_path))
+                    if text:
+                        # "" is also what a failed read returns; leave those for the next run to retry
+                        if cache:
+                            cache.store(full_path, text, max_chars, digests[full_path])
+                            cache.commit()
+                        writer.write(pdf_record(full_path, text))
+        elapsed = time.perf_counter() - started
+        written = writer.count
+    if cache:
+        cache.close()
+
+    if timings:
+        print(f"\n⏱️ Extracted {len(timings)} PDFs in {elapsed:.1f}s. Slowest files:")
+        for seconds, full_path in sorted(timings, reverse=True)[:SLOWEST_TO_REPORT]:
+            print(f"   {seconds:7.2f}s  {full_path}")
+
+    print(f"\n✅ Done. Extracted {written} PDFs successfully. Saved to {save_path}")
+    return written
 
 if __name__ == "__main__":
-    process_pdfs()
+    parser = argparse.ArgumentParser(description="Extract text from the downloaded PDFs.")
+    parser.add_argument("--pdf-dir", default=PDF_DIR)
+    parser.add_argument("--out", default=SAVE_PATH)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--max-chars", type=int, default=MAX_CHARS)
+    parser.add_argument("--cache", default=CACHE_PATH)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    process_pdfs(args.pdf_dir, args.out, None if args.no_cache else args.cache, args.workers, args.max_chars)
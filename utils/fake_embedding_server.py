@@ -0,0 +1,73 @@
+import os
+import json
+import time
+import random
+import hashlib
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# === CONFIG ===
+DIM = 768
+
+
+def fake_vector(text, dim=DIM):
+    """Deterministic unit vector derived from the text hash."""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vec = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = sum(v * v for v in vec) ** 0.5 or 1.0
+    return [v / norm for v in vec]
+
+
+def content_text(content):
+    return "".join(part.get("text", "") for part in content.get("parts", []))
+
+
+class FakeEmbeddingHandler(BaseHTTPRequestHandler):
+    """Speaks the embedContent / batchEmbedContents REST calls used by genai."""
+
+    latency = 0.05
+    fail_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency)
+
+        if random.random() < self.fail_rate:
+            return self._send(429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}})
+
+        if self.path.split("?")[0].endswith(":batchEmbedContents"):
+            vectors = [fake_vector(content_text(r["content"])) for r in body.get("requests", [])]
+            return self._send(200, {"embeddings": [{"values": v} for v in vectors]})
+        if self.path.split("?")[0].endswith(":embedContent"):
+            return self._send(200, {"embedding": {"values": fake_vector(content_text(body["content"]))}})
+        return self._send(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8765, latency=0.05, fail_rate=0.0):
+    FakeEmbeddingHandler.latency = latency
+    FakeEmbeddingHandler.fail_rate = fail_rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeEmbeddingHandler)
+    print(f"🧪 Fake embedding server on http://127.0.0.1:{port} (latency={latency}s, fail_rate={fail_rate})")
+    print(f"   export GEMINI_API_ENDPOINT=http://127.0.0.1:{port}")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini embedding API.")
+    parser.add_argument("--port", type=int, default=int(os.getenv("FAKE_EMBED_PORT", "8765")))
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+    serve(args.port, args.latency, args.fail_rate).serve_forever()
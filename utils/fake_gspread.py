@@ -0,0 +1,71 @@
+"""Local stand-in for the bits of gspread that sheets_to_qna.py uses.
+
+    python utils/sheets_to_qna.py --fake sheets.json
+
+The fixture is {"Sheet title": [["Header", "Question", "Answer"], [...], ...]}.
+values_batch_get() answers like the Sheets API does (trailing empty cells
+and empty sheets trimmed) and `calls` counts requests, so a run can check
+that all sheets were read in one batch.
+"""
+import json
+from collections import Counter
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title):
+        self.spreadsheet = spreadsheet
+        self.title = title
+
+    def get_all_values(self):
+        self.spreadsheet.calls["get_all_values"] += 1
+        rows = self.spreadsheet.sheets[self.title]
+        width = max((len(r) for r in rows), default=0)
+        return [list(r) + [""] * (width - len(r)) for r in rows]
+
+
+class FakeSpreadsheet:
+    def __init__(self, sheets, spreadsheet_id="fake"):
+        self.id = spreadsheet_id
+        self.sheets = sheets
+        self.calls = Counter()
+
+    def worksheets(self):
+        self.calls["worksheets"] += 1
+        return [FakeWorksheet(self, title) for title in self.sheets]
+
+    def worksheet(self, title):
+        self.calls["worksheet"] += 1
+        return FakeWorksheet(self, title)
+
+    def values_batch_get(self, ranges, params=None):
+        self.calls["values_batch_get"] += 1
+        value_ranges = []
+        for a1 in ranges:
+            title = a1.split("!")[0]
+            if title.startswith("'"):
+                title = title[1:-1].replace("''", "'")
+            rows = [list(r) for r in self.sheets[title]]
+            for row in rows:
+                while row and row[-1] == "":
+                    row.pop()
+            while rows and not rows[-1]:
+                rows.pop()
+            entry = {"range": a1, "majorDimension": "ROWS"}
+            if rows:
+                entry["values"] = rows
+            value_ranges.append(entry)
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+
+class FakeClient:
+    def __init__(self, sheets):
+        self.spreadsheet = FakeSpreadsheet(sheets)
+
+    def open_by_key(self, key):
+        self.spreadsheet.id = key
+        return self.spreadsheet
+
+
+def load_fake_client(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return FakeClient(json.load(f))
@@ -0,0 +1,118 @@
+"""Local static site for exercising the crawlers without touching igdtuw.ac.in.
+
+    python utils/fake_site_server.py                 # serve; prints the crawl command
+    python utils/fake_site_server.py --check         # serve, crawl it once, check the output
+
+Pages link to each other through fragment, "index.html" and absolute
+variants of the same URL, one link is dead, one page only says "enable
+JavaScript" and a PDF is linked twice. The handler is the stdlib
+SimpleHTTPRequestHandler, so Last-Modified / If-Modified-Since work and a
+second crawl with --state gets 304s.
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# === CONFIG ===
+PORT = 8766
+FILLER = "Indira Gandhi Delhi Technical University for Women admissions notice. " * 6
+
+SITE = {
+    "index.html": f"""<html><head><title>Home</title></head><body>
+        <p>{FILLER}</p>
+        <a href="sub/index.html#top">Sub (fragment)</a>
+        <a href="/sub/index.html">Sub (absolute)</a>
+        <a href="about.html">About</a>
+        <a href="js.html">App</a>
+        <a href="missing.html">Dead link</a>
+        <a href="docs/notice.pdf">Notice</a>
+        <a href="docs/notice.pdf#page=2">Notice, page 2</a>
+        <a href="https://example.com/elsewhere">External</a>
+    </body></html>""",
+    "sub/index.html": f"""<html><head><title>Sub</title></head><body>
+        <p>{FILLER}</p><a href="../index.html#main">Home</a><a href="../about.html">About</a>
+    </body></html>""",
+    "about.html": f"""<html><head><title>About</title></head><body><p>{FILLER}</p></body></html>""",
+    "js.html": """<html><head><title>App</title></head><body>Please enable JavaScript to use this app.</body></html>""",
+    "docs/notice.pdf": "%PDF-1.4\n% fixture, not a real PDF\n",
+}
+
+# What one crawl from / (max depth 1, no Selenium) must emit
+EXPECTED_PAGES = {"/", "/sub/index.html", "/about.html"}
+EXPECTED_PDFS = {"/docs/notice.pdf"}
+
+
+def write_site(root):
+    for rel, body in SITE.items():
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+    return root
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(root, port=PORT):
+    server = ThreadingHTTPServer(("127.0.0.1", port), partial(QuietHandler, directory=root))
+    print(f"🧪 Fake site on http://127.0.0.1:{server.server_port} (serving {root})")
+    return server
+
+
+def check(base_url):
+    """Crawl `base_url` once into a temp dir; returns the list of problems (empty = pass)."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from async_crawler import crawl_igdtuw_async
+    from jsonl_io import read_jsonl
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        out = os.path.join(out_dir, "web_content.jsonl")
+        crawl_igdtuw_async([base_url + "/"], save_path=out, state_path=None,
+                           base_url=base_url, max_depth=1, use_selenium=False, host_delay=0)
+        records = list(read_jsonl(out))
+
+    def paths(kind):
+        return [r["url"][len(base_url):] for r in records if r["type"] == kind]
+
+    problems = []
+    for kind, expected in (("webpage", EXPECTED_PAGES), ("pdf", EXPECTED_PDFS)):
+        got = paths(kind)
+        if len(got) != len(set(got)):
+            problems.append(f"duplicate {kind} records: {sorted(got)}")
+        if set(got) != expected:
+            problems.append(f"{kind} URLs {sorted(set(got))}, expected {sorted(expected)}")
+    problems += [f"fragment kept in {r['url']}" for r in records if "#" in r["url"]]
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a small static site for crawler runs.")
+    parser.add_argument("--port", type=int, default=int(os.getenv("FAKE_SITE_PORT", str(PORT))))
+    parser.add_argument("--root", help="directory to write the site into (default: a temp dir)")
+    parser.add_argument("--check", action="store_true", help="crawl the site once and check the records")
+    args = parser.parse_args()
+
+    root = write_site(args.root or tempfile.mkdtemp(prefix="fake_site-"))
+    server = serve(root, args.port)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    if not args.check:
+        print(f"   python utils/async_crawler.py --base-url {base_url} --no-selenium --no-state --out web_content.jsonl")
+        server.serve_forever()
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    started = time.perf_counter()
+    problems = check(base_url)
+    server.shutdown()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"✅ Crawl output matches the fixture ({time.perf_counter() - started:.1f}s).")
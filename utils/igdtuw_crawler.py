@@ -1,6 +1,5 @@
 import os
 import time
-import json
 import re
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
@@ -8,10 +7,12 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
+from jsonl_io import read_jsonl, write_jsonl
+from relevance import relevance_from_url
 
 # === CONFIG ===
 BASE_URL = "https://www.igdtuw.ac.in"
-SAVE_PATH = r"igdtuw-data\json_data\web_content.json"
+SAVE_PATH = r"igdtuw-data\json_data\web_content.jsonl"
 
 # === STARTING PAGES ===
 pages_to_check = [
@@ -32,23 +33,6 @@ def is_internal_link(url):
     return url.startswith(BASE_URL) or url.startswith("/")
 
 
-def relevance_from_url(url):
-    """Heuristic label based on URL content."""
-    url_lower = url.lower()
-    if "exam" in url_lower:
-        return "examination info"
-    elif "admission" in url_lower:
-        return "admission info"
-    elif "placement" in url_lower:
-        return "placement info"
-    elif "newsletter" in url_lower:
-        return "news/updates"
-    elif "academic" in url_lower or "course" in url_lower:
-        return "academic content"
-    else:
-        return "general info"
-
-
 def clean_page_text(soup):
     """Extract readable text content from a BeautifulSoup page."""
     for tag in soup(["script", "style", "nav", "footer", "header"]):
@@ -140,8 +124,7 @@ def crawl_igdtuw():
     driver.quit()
 
     # Save metadata + text
-    with open(SAVE_PATH, "w", encoding="utf-8") as f:
-        json.dump(content_data, f, indent=4, ensure_ascii=False)
+    write_jsonl(SAVE_PATH, content_data)
 
     print(f"\n✅ Crawling complete. {total_new} entries saved to {SAVE_PATH}.")
 
@@ -153,11 +136,8 @@ def search_content(keyword=None, content_type=None, relevance=None):
         print("❌ No data found. Run crawl_igdtuw() first.")
         return []
 
-    with open(SAVE_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
     results = []
-    for item in data:
+    for item in read_jsonl(SAVE_PATH):
         if keyword and keyword.lower() not in item["text"].lower():
             continue
         if content_type and item["type"] != content_type:
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+
+# === CONFIG ===
+POLL_INTERVAL = 0.5         # seconds between checks when following a growing file
+IDLE_TIMEOUT = 600          # give up following a writer that has gone quiet for this long
+
+
+def marker_path(path):
+    """Exists while a JsonlWriter still has `path` open."""
+    return path + ".writing"
+
+
+def is_writing(path):
+    return os.path.exists(marker_path(path))
+
+
+class JsonlWriter:
+    """Append one JSON record per line, flushed immediately.
+
+    Every complete line is a usable record, so a crash leaves a readable
+    prefix and readers can follow the file while it is being written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(marker_path(path), "w").close()
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.f.flush()
+        self.count += 1
+
+    def close(self, complete=True):
+        """Close the file; the marker is removed only when `complete`, so a
+        writer that failed midway never looks finished to readers."""
+        self.f.close()
+        if complete and os.path.exists(marker_path(self.path)):
+            os.remove(marker_path(self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close(complete=exc[0] is None)
+
+
+def write_jsonl(path, records):
+    """Stream `records` (any iterable) to `path`; returns the number written."""
+    with JsonlWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
+
+
+def read_jsonl(path, follow=False, idle_timeout=IDLE_TIMEOUT):
+    """Yield records from `path` one at a time.
+
+    A torn last line (the writer crashed mid-record) is skipped. With
+    follow=True the generator keeps waiting for new lines while the writer's
+    marker exists, and raises TimeoutError if nothing arrives for
+    `idle_timeout` seconds. Legacy files holding a single JSON array are
+    still accepted, but are loaded whole.
+    """
+    waited = 0.0
+    while follow and not os.path.exists(path):
+        if waited > idle_timeout:
+            raise TimeoutError(f"{path} was never created")
+        time.sleep(POLL_INTERVAL)
+        waited += POLL_INTERVAL
+
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head.isspace():
+            head = f.read(1)
+        if head == "[":
+            f.seek(0)
+            yield from json.load(f)
+            return
+        f.seek(0)
+
+        pending = ""
+        writer_done = not follow
+        last_data = time.monotonic()
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                if not pending.endswith("\n"):
+                    continue        # the writer is mid-line; wait for the rest
+                line, pending = pending, ""
+                last_data = time.monotonic()
+                if line.strip():
+                    yield json.loads(line)
+                continue
+            if writer_done:
+                break
+            if not is_writing(path):
+                writer_done = True  # one more pass for lines written just before the marker went
+                continue
+            if time.monotonic() - last_data > idle_timeout:
+                raise TimeoutError(f"{path} has not grown for {idle_timeout}s; is its writer still running?")
+            time.sleep(POLL_INTERVAL)
+
+        if pending.strip():
+            try:
+                yield json.loads(pending)
+            except json.JSONDecodeError:
+                print(f"⚠️ Skipping truncated last record in {path}")
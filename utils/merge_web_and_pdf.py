@@ -1,29 +1,45 @@
-import json
+import argparse
+from jsonl_io import read_jsonl, write_jsonl
 
+WEB_PATH = r"igdtuw-data\json_data\web_content.jsonl"
+PDF_PATH = r"igdtuw-data\json_data\pdf_texts.jsonl"
+SAVE_PATH = r"igdtuw-data\json_data\merged_content.jsonl"
+UPLOADS_PREFIX = "https://www.igdtuw.ac.in/IGDTUW/uploads/"
 
-# Load web and pdf data
-with open(r"igdtuw-data\json_data\web_content.json", "r", encoding="utf-8") as f:
-    web_data = json.load(f)
-with open(r"igdtuw-data\json_data\pdf_texts.json", "r", encoding="utf-8") as f:
-    pdf_data = json.load(f)
+stats = {"removed": 0}
 
-for item in pdf_data:
-    if "path" in item:
-        item["url"] = item.pop("path")
 
-# --- Filter web_data to remove unwanted PDFs ---
-filtered_web_data = [
-    item for item in web_data
-    if not (item.get("url", "").startswith("https://www.igdtuw.ac.in/IGDTUW/uploads/") and item.get("url", "").endswith(".pdf"))
-]
+def web_records(path, follow=False):
+    """Web entries, minus the uploaded PDFs (their text comes from pdf_texts instead)."""
+    for item in read_jsonl(path, follow=follow):
+        url = item.get("url", "")
+        if url.startswith(UPLOADS_PREFIX) and url.endswith(".pdf"):
+            stats["removed"] += 1
+            continue
+        yield item
 
-print(f"Removed {len(web_data) - len(filtered_web_data)} unwanted PDF entries from web_content.json")
 
-# Merge filtered web data with pdf data
-merged = filtered_web_data + pdf_data
+def pdf_records(path, follow=False):
+    for item in read_jsonl(path, follow=follow):
+        if "path" in item:
+            item["url"] = item.pop("path")
+        yield item
 
-# Save the merged content
-with open(r"igdtuw-data\json_data\merged_content.json", "w", encoding="utf-8") as f:
-    json.dump(merged, f, indent=4, ensure_ascii=False)
 
-print(f"Merged total entries: {len(merged)}")
+def merged_records(web_path=WEB_PATH, pdf_path=PDF_PATH, follow=False):
+    yield from web_records(web_path, follow)
+    yield from pdf_records(pdf_path, follow)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge web pages and PDF texts into merged_content.jsonl.")
+    parser.add_argument("--web", default=WEB_PATH)
+    parser.add_argument("--pdfs", default=PDF_PATH)
+    parser.add_argument("--out", default=SAVE_PATH)
+    parser.add_argument("--follow", action="store_true", help="keep reading inputs that are still being written")
+    args = parser.parse_args()
+
+    total = write_jsonl(args.out, merged_records(args.web, args.pdfs, args.follow))
+
+    print(f"Removed {stats['removed']} unwanted PDF entries from {args.web}")
+    print(f"Merged total entries: {total}")
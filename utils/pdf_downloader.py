@@ -1,4 +1,5 @@
 import os
+import json
 import time
 import requests
 from bs4 import BeautifulSoup
@@ -7,11 +8,14 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from urllib.parse import urljoin, urlparse
+from crawl_state import CrawlState, content_hash, STATE_PATH
 
 # === CONFIG ===
 BASE_URL = "https://www.igdtuw.ac.in"
 SAVE_DIR = "./igdtuw-data/pdfs"
+CHANGES_PATH = "./igdtuw-data/json_data/pdf_changes.json"   # new/updated PDFs from the last run
 os.makedirs(SAVE_DIR, exist_ok=True)
+os.makedirs(os.path.dirname(CHANGES_PATH), exist_ok=True)
 
 # === STARTING PAGES ===
 pages_to_check = [
@@ -26,10 +30,37 @@ pages_to_check = [
 
 # Track visited URLs to avoid loops
 visited = set()
+# Remembers ETag / Last-Modified / hash per PDF so unchanged files come back as 304
+crawl_state = CrawlState(STATE_PATH)
+changed_pdfs = []
 
 def is_internal_link(url):
     return url.startswith(BASE_URL) or url.startswith("/")
 
+def download_pdf(full_url):
+    """Conditional GET of one PDF; writes it only if it is new or its content changed."""
+    pdf_name = full_url.split("/")[-1]
+    save_path = os.path.join(SAVE_DIR, pdf_name)
+    headers = crawl_state.conditional_headers(full_url) if os.path.exists(save_path) else {}
+    try:
+        pdf_data = requests.get(full_url, headers=headers, timeout=15)
+        if pdf_data.status_code == 304:
+            crawl_state.touch(full_url)
+            return False
+        pdf_data.raise_for_status()
+        changed = crawl_state.update(full_url, pdf_data.headers, content_hash(pdf_data.content))
+        if not changed and os.path.exists(save_path):
+            return False
+        with open(save_path, "wb") as f:
+            f.write(pdf_data.content)
+        changed_pdfs.append({"url": full_url, "path": save_path})
+        print(f"✅ Downloaded: {pdf_name}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Error downloading {full_url}: {e}")
+        return False
+
+
 def fetch_pdfs_from_page(driver, page_url, depth=0, max_depth=1):
     """Recursively crawl IGDTUW pages up to max_depth to find PDFs."""
     if page_url in visited or depth > max_depth:
@@ -55,18 +86,10 @@ def fetch_pdfs_from_page(driver, page_url, depth=0, max_depth=1):
 
             # === CASE 1: PDF Link ===
             if href.lower().endswith(".pdf"):
-                pdf_name = full_url.split("/")[-1]
-                save_path = os.path.join(SAVE_DIR, pdf_name)
-                if not os.path.exists(save_path):
-                    try:
-                        pdf_data = requests.get(full_url, timeout=15)
-                        pdf_data.raise_for_status()
-                        with open(save_path, "wb") as f:
-                            f.write(pdf_data.content)
-                        print(f"✅ Downloaded: {pdf_name}")
-                        new_files += 1
-                    except Exception as e:
-                        print(f"⚠️ Error downloading {full_url}: {e}")
+                if full_url in crawl_state.seen:
+                    continue
+                if download_pdf(full_url):
+                    new_files += 1
 
             # === CASE 2: Internal Link (go deeper) ===
             elif is_internal_link(full_url):
@@ -99,10 +122,13 @@ def fetch_pdfs():
 
     driver.quit()
 
+    with open(CHANGES_PATH, "w", encoding="utf-8") as f:
+        json.dump(changed_pdfs, f, indent=4, ensure_ascii=False)
+
     if total_new == 0:
         print("\nNo new PDFs found — everything is up to date.")
     else:
-        print(f"\n✨ {total_new} new PDFs saved to {SAVE_DIR}.")
+        print(f"\n✨ {total_new} new or updated PDFs saved to {SAVE_DIR} (listed in {CHANGES_PATH}).")
 
 
 if __name__ == "__main__":
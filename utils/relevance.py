@@ -0,0 +1,59 @@
+import re
+import datetime
+
+# Years that can plausibly be about the university; older numbers are usually noise
+MIN_YEAR = 2000
+YEAR_PATTERN = re.compile(r"(?<!\d)(20\d{2})(?!\d)")
+
+
+def relevance_from_url(url):
+    """Heuristic label based on URL content."""
+    url_lower = url.lower()
+    if "exam" in url_lower:
+        return "examination info"
+    elif "admission" in url_lower:
+        return "admission info"
+    elif "placement" in url_lower:
+        return "placement info"
+    elif "newsletter" in url_lower:
+        return "news/updates"
+    elif "academic" in url_lower or "course" in url_lower:
+        return "academic content"
+    else:
+        return "general info"
+
+
+def relevance_from_text(text):
+    """Infer relevance from keywords in the text."""
+    t = text.lower()
+    if "exam" in t or "datesheet" in t:
+        return "examination info"
+    elif "admission" in t:
+        return "admission info"
+    elif "placement" in t:
+        return "placement info"
+    elif "result" in t:
+        return "result notice"
+    elif "circular" in t:
+        return "university notice"
+    else:
+        return "general info"
+
+
+def document_category(url, title="", relevance_hint=""):
+    """Category for one crawled/extracted record.
+
+    PDFs already carry a hint inferred from their text; web pages are
+    labelled from the URL, then the title. Page bodies are not used: most
+    pages mention exams or admissions somewhere, which would swamp the label.
+    """
+    for label in (relevance_hint, relevance_from_url(url), relevance_from_text(title or "")):
+        if label and label != "general info":
+            return label
+    return "general info"
+
+
+def years_in(text, max_year=None):
+    """Sorted distinct plausible years mentioned in `text`."""
+    max_year = max_year or datetime.date.today().year + 1
+    return sorted({int(y) for y in YEAR_PATTERN.findall(text) if MIN_YEAR <= int(y) <= max_year})
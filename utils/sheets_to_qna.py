@@ -1,53 +1,159 @@
+import os
 import json
-import gspread
-import pandas as pd
-from oauth2client.service_account import ServiceAccountCredentials
+import argparse
 
 # === CONFIG ===
 SERVICE_ACCOUNT_FILE = "credentials.json"  # path to your downloaded JSON
 SPREADSHEET_ID = "1tS4uSqKedvGqCssTuXmhJFxspM9uHBvkLMBU_xULa6U"     # from your Google Sheets URL
 OUTPUT_FILE = "qna_data.json"
+CHANGES_FILE = "qna_changes.json"   # what `qna_vectorstore.py --changes` applies
 
-# === SETUP GOOGLE SHEETS CONNECTION ===
-scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds = ServiceAccountCredentials.from_json_keyfile_name(SERVICE_ACCOUNT_FILE, scope)
-client = gspread.authorize(creds)
 
-spreadsheet = client.open_by_key(SPREADSHEET_ID)
-sheet_names = [s.title for s in spreadsheet.worksheets()]
+def open_spreadsheet(credentials_path=SERVICE_ACCOUNT_FILE, spreadsheet_id=SPREADSHEET_ID):
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
 
-all_qna = []
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, scope)
+    return gspread.authorize(creds).open_by_key(spreadsheet_id)
 
-for name in sheet_names:
-    print(f"📄 Reading sheet: {name}")
-    sheet = spreadsheet.worksheet(name)
 
-    values = sheet.get_all_values()
+def a1_sheet(title):
+    """Whole-sheet A1 range; quotes are doubled inside the sheet name."""
+    return "'" + title.replace("'", "''") + "'"
 
+
+def read_all_sheets(spreadsheet):
+    """{sheet title: rows} for every worksheet, in one values.batchGet request.
+
+    (Plus the worksheets() metadata call.) Unlike get_all_values(), batchGet
+    drops trailing empty cells, so rows can be ragged; qna_pairs() pads them.
+    """
+    titles = [ws.title for ws in spreadsheet.worksheets()]
+    if not titles:
+        return {}
+    response = spreadsheet.values_batch_get([a1_sheet(t) for t in titles])
+    # valueRanges come back in request order; "values" is missing for an empty sheet
+    return {title: vr.get("values", []) for title, vr in zip(titles, response.get("valueRanges", []))}
+
+
+def qna_pairs(name, values):
+    """QnA pairs of one sheet: first row is the header, the last two columns are Q and A."""
     if not values or len(values) < 2:
         print(f"⚠️  Skipping '{name}' — not enough data.")
-        continue
-
-    df = pd.DataFrame(values[1:], columns=values[0])  # treat first row as header
-    if df.shape[1] < 2:
+        return []
+    width = max(len(r) for r in values)    # batchGet rows are ragged; the header can be the short one
+    if width < 2:
         print(f"⚠️  Skipping '{name}' — less than 2 columns.")
-        continue
-
-    # take last two columns as Q and A
-    q_col, a_col = df.columns[-2], df.columns[-1]
+        return []
 
-    for _, row in df.iterrows():
-        q = str(row[q_col]).strip()
-        a = str(row[a_col]).strip()
+    pairs = []
+    for row in values[1:]:
+        row = (list(row) + [""] * width)[:width]
+        q = str(row[-2]).strip()
+        a = str(row[-1]).strip()
         if q and a and q.lower() != "question" and a.lower() != "answer":
-            all_qna.append({
-                "sheet": name,
-                "question": q,
-                "answer": a
-            })
+            pairs.append({"sheet": name, "question": q, "answer": a})
+    return pairs
+
+
+def read_qna(spreadsheet):
+    all_qna = []
+    for name, values in read_all_sheets(spreadsheet).items():
+        print(f"📄 Read sheet: {name}")
+        all_qna.extend(qna_pairs(name, values))
+    return all_qna
+
+
+def pair_key(pair):
+    """What a pair's stable ID is derived from (see qna_vectorstore.load_documents)."""
+    return (pair.get("sheet", ""), pair["question"])
+
+
+def first_by_key(pairs):
+    """{key: pair}; on duplicate questions the first occurrence wins, as in the collection."""
+    out = {}
+    for p in pairs:
+        out.setdefault(pair_key(p), p)
+    return out
+
+
+def diff_qna(old, new):
+    """{"added", "changed", "deleted"} lists of pairs, keyed on (sheet, question)."""
+    before, after = first_by_key(old), first_by_key(new)
+    return {
+        "added": [p for k, p in after.items() if k not in before],
+        "changed": [p for k, p in after.items() if k in before and before[k]["answer"] != p["answer"]],
+        "deleted": [p for k, p in before.items() if k not in after],
+    }
+
+
+def merge_changes(pending, changes, current):
+    """Fold `changes` into a change list that has not been applied yet.
+
+    The result takes the collection from where `pending` started to
+    `current`; a pair that is live again counts as added/changed, anything
+    gone counts as deleted. (Re-upserting an unchanged pair is harmless.)
+    """
+    live = first_by_key(current)
+    added = first_by_key(pending["added"] + changes["added"])
+    changed = first_by_key(pending["changed"] + changes["changed"])
+    deleted = first_by_key(pending["deleted"] + changes["deleted"])
+    return {
+        "added": [live[k] for k in added if k in live],
+        "changed": [live[k] for k in changed if k in live and k not in added],
+        "deleted": [p for k, p in deleted.items() if k not in live],
+    }
+
+
+def load_qna(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def sync_sheets(spreadsheet, output_file=OUTPUT_FILE, changes_file=CHANGES_FILE):
+    """Read every sheet, diff against `output_file` and write both files only if something changed.
+
+    `changes_file` is removed by `qna_vectorstore.py --changes` once applied.
+    Returns the diff.
+    """
+    all_qna = read_qna(spreadsheet)
+    changes = diff_qna(load_qna(output_file), all_qna)
+    if not any(changes.values()) and os.path.exists(output_file):
+        print(f"\n✅ {len(all_qna)} QnA pairs, nothing changed since the last sync.")
+        return changes
+
+    if os.path.exists(changes_file):
+        # The last change list was never applied; keep its changes too
+        with open(changes_file, "r", encoding="utf-8") as f:
+            changes = merge_changes(json.load(f), changes, all_qna)
+    counts = {kind: len(pairs) for kind, pairs in changes.items()}
+    write_json(output_file, all_qna)
+    write_json(changes_file, changes)
+    print(f"\n✅ Saved {len(all_qna)} QnA pairs to {output_file} "
+          f"({counts['added']} added, {counts['changed']} changed, {counts['deleted']} deleted → {changes_file})")
+    return changes
+
 
-# === SAVE COMBINED QNA DATA ===
-with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-    json.dump(all_qna, f, ensure_ascii=False, indent=2)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pull the QnA Google Sheet into qna_data.json plus a change list.")
+    parser.add_argument("--out", default=OUTPUT_FILE)
+    parser.add_argument("--changes", default=CHANGES_FILE)
+    parser.add_argument("--fake", metavar="SHEETS_JSON", help="read a local fake_gspread.py fixture instead of Google")
+    args = parser.parse_args()
 
-print(f"\n✅ Saved {len(all_qna)} QnA pairs to {OUTPUT_FILE}")
\ No newline at end of file
+    if args.fake:
+        from fake_gspread import load_fake_client
+        spreadsheet = load_fake_client(args.fake).open_by_key(SPREADSHEET_ID)
+    else:
+        spreadsheet = open_spreadsheet()
+    sync_sheets(spreadsheet, args.out, args.changes)
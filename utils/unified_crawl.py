@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from async_crawler import AsyncCrawler, changes_path, CONCURRENCY, PER_HOST, HOST_DELAY
+from crawl_state import CrawlState, STATE_PATH
+from igdtuw_crawler import BASE_URL, SAVE_PATH, pages_to_check
+from jsonl_io import JsonlWriter, write_jsonl
+
+# === CONFIG ===
+PDF_DIR = "./igdtuw-data/pdfs"
+PDF_CHANGES_PATH = "./igdtuw-data/json_data/pdf_changes.json"
+DOWNLOAD_CONCURRENCY = 4
+CHUNK_SIZE = 64 * 1024
+
+
+class UnifiedCrawler(AsyncCrawler):
+    """One pass over the site that produces both web_content.jsonl and the PDF folder.
+
+    Every page is fetched and parsed once. PDF links found on the way are
+    streamed into a download queue served by `download_concurrency` workers
+    that share the crawler's per-host politeness and crawl state.
+    """
+
+    def __init__(self, pdf_dir=PDF_DIR, download_concurrency=DOWNLOAD_CONCURRENCY, **kwargs):
+        super().__init__(**kwargs)
+        self.pdf_dir = pdf_dir
+        self.download_concurrency = download_concurrency
+        self.pdf_queue = None
+        self.loop = None
+        self.changed_pdfs = []
+        self.pdfs_unchanged = 0
+        self.pdf_errors = 0
+        os.makedirs(pdf_dir, exist_ok=True)
+
+    def on_pdf(self, url, link_text):
+        self.record_pdf(url, link_text)
+        # May be called from the Selenium fallback thread
+        self.loop.call_soon_threadsafe(self.pdf_queue.put_nowait, url)
+
+    async def download(self, client, url):
+        """Conditional, streaming download; the file is replaced only if its bytes changed."""
+        pdf_name = url.split("/")[-1]
+        save_path = os.path.join(self.pdf_dir, pdf_name)
+        tmp_path = save_path + ".part"
+        headers = self.state.conditional_headers(url) if self.state and os.path.exists(save_path) else {}
+
+        try:
+            slot = await self.polite(url)
+            try:
+                async with client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304:
+                        self.state.touch(url)
+                        self.pdfs_unchanged += 1
+                        return
+                    response.raise_for_status()
+                    digest = hashlib.sha256()
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            digest.update(chunk)
+                            f.write(chunk)
+                    response_headers = response.headers
+            finally:
+                slot.release()
+
+            changed = self.state.update(url, response_headers, digest.hexdigest()) if self.state else True
+            if changed or not os.path.exists(save_path):
+                os.replace(tmp_path, save_path)
+                self.changed_pdfs.append({"url": url, "path": save_path})
+                print(f"✅ Downloaded: {pdf_name}")
+            else:
+                self.pdfs_unchanged += 1
+        finally:
+            # Unchanged, failed or cancelled: no partial file left behind
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def download_worker(self, client):
+        while True:
+            url = await self.pdf_queue.get()
+            try:
+                await self.download(client, url)
+            except Exception as e:
+                self.pdf_errors += 1
+                print(f"⚠️ Error downloading {url}: {e}")
+            finally:
+                self.pdf_queue.task_done()
+
+    async def crawl(self, start_urls):
+        self.loop = asyncio.get_running_loop()
+        self.pdf_queue = asyncio.Queue()
+        # Pages and PDFs share one pool, sized for both kinds of workers
+        async with self.make_client(self.concurrency + self.download_concurrency) as client:
+            downloaders = [asyncio.create_task(self.download_worker(client)) for _ in range(self.download_concurrency)]
+            content_data = await super().crawl(start_urls, client)
+            await asyncio.sleep(0)      # let PDFs queued by the Selenium thread arrive
+            await self.pdf_queue.join()
+            for d in downloaders:
+                d.cancel()
+            await asyncio.gather(*downloaders, return_exceptions=True)
+        return content_data
+
+
+def unified_crawl(start_urls=None, save_path=SAVE_PATH, pdf_changes_path=PDF_CHANGES_PATH,
+                  state_path=STATE_PATH, **kwargs):
+    state = CrawlState(state_path) if state_path else None
+    started = time.perf_counter()
+    with JsonlWriter(save_path) as sink:
+        crawler = UnifiedCrawler(state=state, sink=sink, **kwargs)
+        asyncio.run(crawler.crawl(start_urls or pages_to_check))
+    elapsed = time.perf_counter() - started
+
+    write_jsonl(changes_path(save_path), crawler.changed)
+    os.makedirs(os.path.dirname(pdf_changes_path) or ".", exist_ok=True)
+    with open(pdf_changes_path, "w", encoding="utf-8") as f:
+        json.dump(crawler.changed_pdfs, f, indent=4, ensure_ascii=False)
+
+    print(f"\n✅ Unified crawl complete in {elapsed:.1f}s.")
+    print(f"   Pages: {crawler.emitted} entries in {save_path} ({crawler.fetched} fetched, "
+          f"{crawler.not_modified} not modified, {len(crawler.changed)} new/changed, {crawler.errors} errors)")
+    print(f"   PDFs:  {len(crawler.changed_pdfs)} new/updated in {crawler.pdf_dir}, "
+          f"{crawler.pdfs_unchanged} unchanged, {crawler.pdf_errors} errors")
+    return crawler.emitted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl pages and download PDFs in a single pass.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--start", nargs="*", help="start URLs (default: igdtuw_crawler.pages_to_check)")
+    parser.add_argument("--max-depth", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--per-host", type=int, default=PER_HOST)
+    parser.add_argument("--host-delay", type=float, default=HOST_DELAY)
+    parser.add_argument("--download-concurrency", type=int, default=DOWNLOAD_CONCURRENCY)
+    parser.add_argument("--no-selenium", action="store_true")
+    parser.add_argument("--out", default=SAVE_PATH)
+    parser.add_argument("--pdf-dir", default=PDF_DIR)
+    parser.add_argument("--pdf-changes", default=PDF_CHANGES_PATH)
+    parser.add_argument("--state", default=STATE_PATH)
+    parser.add_argument("--no-state", action="store_true")
+    args = parser.parse_args()
+
+    start_urls = args.start or (pages_to_check if args.base_url == BASE_URL else [args.base_url + "/"])
+    unified_crawl(
+        start_urls,
+        save_path=args.out,
+        pdf_changes_path=args.pdf_changes,
+        state_path=None if args.no_state else args.state,
+        base_url=args.base_url,
+        max_depth=args.max_depth,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        host_delay=args.host_delay,
+        use_selenium=not args.no_selenium,
+        pdf_dir=args.pdf_dir,
+        download_concurrency=args.download_concurrency,
+    )
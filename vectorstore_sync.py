@@ -0,0 +1,119 @@
+import os
+import hashlib
+from tqdm import tqdm
+from answer_cache import bump_index_version
+from memory_index import export_snapshot, SNAPSHOT_DIR
+from bm25_index import build_from_chroma, INDEX_PATH as BM25_PATH
+
+# === CONFIG ===
+SYNC_BATCH_SIZE = 400
+
+
+def stable_id(prefix, key):
+    """Deterministic document ID (Python's hash() is salted per process)."""
+    return f"{prefix}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]}"
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def existing_hashes(collection, page_size=5000):
+    """Map of id -> content_hash for everything already stored in `collection`."""
+    stored = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for doc_id, meta in zip(page["ids"], page["metadatas"]):
+            stored[doc_id] = (meta or {}).get("content_hash", "")
+        if len(page["ids"]) < page_size:
+            return stored
+        offset += page_size
+
+
+def pending_docs(docs, stored, seen):
+    """Yield the new/changed docs from a (possibly streaming) iterable, recording every ID in `seen`."""
+    for doc in docs:
+        if doc["id"] in seen:
+            continue  # first occurrence wins on duplicate URLs
+        seen.add(doc["id"])
+        if stored.get(doc["id"]) != doc["metadata"]["content_hash"]:
+            yield doc
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def sync_collection(collection, docs, engine, batch_size=SYNC_BATCH_SIZE, delete_missing=True):
+    """Upsert only new/changed docs and delete removed ones.
+
+    `docs` may be a generator: batches are embedded as they arrive, and
+    IDs that never showed up are deleted only once the stream is exhausted
+    (pass delete_missing=False when the stream is known to be partial).
+    An interrupted run picks up where it stopped: every finished batch is
+    already stored with its content_hash, so the next run skips it.
+    """
+    stored = existing_hashes(collection)
+    print(f"🔄 Syncing {collection.name} ({len(stored)} docs stored)...")
+
+    seen = set()
+    upserted = 0
+    progress = tqdm(desc=f"Syncing {collection.name}", unit="doc")
+    for batch in batched(pending_docs(docs, stored, seen), batch_size):
+        texts = [doc["text"] for doc in batch]
+        embeddings = engine.embed(texts, keys=batch)
+        upserted += upsert_embedded(collection, batch, embeddings)
+        progress.update(len(batch))
+    progress.close()
+
+    to_delete = [doc_id for doc_id in stored if doc_id not in seen] if delete_missing else []
+    if to_delete:
+        print(f"🗑️ Deleting {len(to_delete)} docs no longer in the source data.")
+        for start in range(0, len(to_delete), batch_size):
+            collection.delete(ids=to_delete[start:start + batch_size])
+
+    # --- Retry whatever failed instead of storing zero vectors ---
+    if engine.retry_queue:
+        print(f"🔁 Retrying {len(engine.retry_queue)} failed embeddings...")
+        for doc, emb in engine.drain_retry_queue():
+            upserted += upsert_embedded(collection, [doc], [emb])
+        if engine.retry_queue:
+            print(f"⚠️ {len(engine.retry_queue)} documents could not be embedded and were skipped "
+                  f"(they will be picked up by the next sync).")
+
+    # Lets the API's semantic answer cache know its answers may be stale
+    if upserted or to_delete:
+        bump_index_version()
+
+    return upserted, len(to_delete)
+
+
+def upsert_embedded(collection, docs, embeddings):
+    """Upsert only the docs that actually got an embedding; returns the count."""
+    ok = [j for j, emb in enumerate(embeddings) if emb is not None]
+    if ok:
+        collection.upsert(
+            ids=[docs[j]["id"] for j in ok],
+            embeddings=[embeddings[j] for j in ok],
+            documents=[docs[j]["text"] for j in ok],
+            metadatas=[docs[j]["metadata"] for j in ok],
+        )
+    return len(ok)
+
+
+def refresh_derived_indexes(chroma_client, changed):
+    """After a sync: re-export the in-memory retriever's snapshot (if one is in
+    use) when the store changed, and rebuild the BM25 index, which needs no
+    embeddings, whenever it changed or is missing."""
+    if changed and os.path.exists(SNAPSHOT_DIR):
+        export_snapshot(chroma_client)
+    if changed or not os.path.exists(BM25_PATH):
+        build_from_chroma(chroma_client)